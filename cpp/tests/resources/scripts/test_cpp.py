@@ -15,15 +15,23 @@
 # limitations under the License.
 
 import argparse as _arg
+import importlib.util as _iu
 import logging as _log
 import os as _os
 import pathlib as _pl
 import platform
+import shutil as _shutil
 import subprocess as _sp
 import sys as _sys
 import typing as _tp
+from itertools import chain
 from multiprocessing import cpu_count
 
+# Resolve the external tools once instead of walking $PATH on every call.
+_CMAKE = _shutil.which("cmake") or "cmake"
+_CTEST = _shutil.which("ctest") or "ctest"
+_MPIRUN = _shutil.which("mpirun") or "mpirun"
+
 
 def find_dir_containing(files: _tp.Sequence[str],
                         start_dir: _tp.Optional[_pl.Path] = None) -> _pl.Path:
@@ -60,6 +68,15 @@ def run_command(command: _tp.Sequence[str],
     _sp.check_call(command, cwd=cwd, shell=shell, env=env, timeout=timeout)
 
 
+def is_requirement_satisfied(requirement: str) -> bool:
+    import pkg_resources as _pkg
+    try:
+        _pkg.require(requirement)
+    except (_pkg.DistributionNotFound, _pkg.VersionConflict):
+        return False
+    return True
+
+
 def build_trt_llm(python_exe: str,
                   root_dir: _pl.Path,
                   build_dir: _pl.Path,
@@ -129,25 +146,38 @@ def run_tests(cuda_architectures: _tp.Optional[str] = None,
                   job_count=job_count)
 
     if run_mamba:
-        run_command(
-            [python_exe, "-m", "pip", "install", "transformers>=4.39.0"],
-            cwd=root_dir,
-            env=_os.environ,
-            timeout=300)
+        if is_requirement_satisfied("transformers>=4.39.0"):
+            _log.info("transformers>=4.39.0 already installed")
+        else:
+            run_command(
+                [python_exe, "-m", "pip", "install", "transformers>=4.39.0"],
+                cwd=root_dir,
+                env=_os.environ,
+                timeout=300)
 
     if run_recurrentgemma:
-        run_command([
-            "git", "clone",
-            "https://github.com/google-deepmind/recurrentgemma.git"
-        ],
+        if _iu.find_spec("recurrentgemma") is not None:
+            _log.info("recurrentgemma already installed")
+        else:
+            if (root_dir / "recurrentgemma").exists():
+                run_command(
+                    ["git", "-C", "recurrentgemma", "pull", "--ff-only"],
                     cwd=root_dir,
                     env=_os.environ,
                     timeout=300)
-        run_command(
-            [python_exe, "-m", "pip", "install", "./recurrentgemma[full]"],
-            cwd=root_dir,
-            env=_os.environ,
-            timeout=300)
+            else:
+                run_command([
+                    "git", "clone",
+                    "https://github.com/google-deepmind/recurrentgemma.git"
+                ],
+                            cwd=root_dir,
+                            env=_os.environ,
+                            timeout=300)
+            run_command(
+                [python_exe, "-m", "pip", "install", "./recurrentgemma[full]"],
+                cwd=root_dir,
+                env=_os.environ,
+                timeout=300)
 
     build_dir = build_dir if build_dir.is_absolute() else root_dir / build_dir
     resources_dir = _pl.Path("cpp") / "tests" / "resources"
@@ -246,7 +276,7 @@ def prepare_all_model_tests(python_exe: str,
                             run_recurrentgemma=False,
                             run_encoder=False,
                             run_fp8=False):
-    model_cache_arg = ["--model_cache", model_cache] if model_cache else []
+    model_cache_arg = ("--model_cache", model_cache) if model_cache else ()
 
     if run_gpt:
         prepare_model_tests(model_name="gpt",
@@ -264,7 +294,7 @@ def prepare_all_model_tests(python_exe: str,
                             resources_dir=resources_dir,
                             model_cache_arg=model_cache_arg)
         if run_fp8:
-            only_fp8_arg = ["--only_fp8"]
+            only_fp8_arg = ("--only_fp8", )
             prepare_model_tests(model_name="gptj",
                                 python_exe=python_exe,
                                 root_dir=root_dir,
@@ -333,8 +363,8 @@ def prepare_multi_gpu_model_tests(python_exe: str,
                                   root_dir: _pl.Path,
                                   resources_dir: _pl.Path,
                                   model_cache: _tp.Optional[str] = None):
-    model_cache_arg = ["--model_cache", model_cache] if model_cache else []
-    only_multi_gpu_arg = ["--only_multi_gpu"]
+    model_cache_arg = ("--model_cache", model_cache) if model_cache else ()
+    only_multi_gpu_arg = ("--only_multi_gpu", )
 
     prepare_model_tests(model_name="llama",
                         python_exe=python_exe,
@@ -348,29 +378,32 @@ def prepare_model_tests(model_name: str,
                         python_exe: str,
                         root_dir: _pl.Path,
                         resources_dir: _pl.Path,
-                        model_cache_arg=[],
-                        only_fp8_arg=[],
-                        only_multi_gpu_arg=[]):
-    scripts_dir = resources_dir / "scripts"
+                        model_cache_arg: _tp.Tuple[str, ...] = (),
+                        only_fp8_arg: _tp.Tuple[str, ...] = (),
+                        only_multi_gpu_arg: _tp.Tuple[str, ...] = ()):
+    scripts_dir = _os.path.join(resources_dir, "scripts")
 
     model_env = {**_os.environ, "PYTHONPATH": f"examples/{model_name}"}
     build_engines = [
         python_exe,
-        str(scripts_dir / f"build_{model_name}_engines.py")
-    ] + model_cache_arg + only_fp8_arg + only_multi_gpu_arg
+        _os.path.join(scripts_dir, f"build_{model_name}_engines.py")
+    ]
+    build_engines.extend(
+        chain(model_cache_arg, only_fp8_arg, only_multi_gpu_arg))
     run_command(build_engines, cwd=root_dir, env=model_env, timeout=1800)
 
     model_env["PYTHONPATH"] = "examples"
-    generate_expected_output = [
-        python_exe,
-        str(scripts_dir / f"generate_expected_{model_name}_output.py")
-    ] + only_fp8_arg + only_multi_gpu_arg
-    if "enc_dec" in model_name:
-        generate_expected_output += model_cache_arg
+    generate_expected_output = []
     if only_multi_gpu_arg:
-        generate_expected_output = [
-            "mpirun", "-n", "4", "--allow-run-as-root", "--timeout", "600"
-        ] + generate_expected_output
+        generate_expected_output.extend(
+            (_MPIRUN, "-n", "4", "--allow-run-as-root", "--timeout", "600"))
+    generate_expected_output.extend(
+        (python_exe,
+         _os.path.join(scripts_dir,
+                       f"generate_expected_{model_name}_output.py")))
+    generate_expected_output.extend(chain(only_fp8_arg, only_multi_gpu_arg))
+    if "enc_dec" in model_name:
+        generate_expected_output.extend(model_cache_arg)
     run_command(generate_expected_output,
                 cwd=root_dir,
                 env=model_env,
@@ -379,7 +412,7 @@ def prepare_model_tests(model_name: str,
 
 def build_tests(build_dir: _pl.Path):
     make_google_tests = [
-        "cmake", "--build", ".", "--config", "Release", "-j", "--target",
+        _CMAKE, "--build", ".", "--config", "Release", "-j", "--target",
         "google-tests"
     ]
     run_command(make_google_tests, cwd=build_dir, timeout=300)
@@ -390,7 +423,7 @@ def run_unit_tests(build_dir: _pl.Path, timeout=1800):
 
     cpp_env = {**_os.environ}
     ctest = [
-        "ctest", "--output-on-failure", "--output-junit",
+        _CTEST, "--output-on-failure", "--output-junit",
         "results-unit-tests.xml"
     ]
     excluded_tests = []
@@ -421,7 +454,7 @@ def run_single_gpu_tests(build_dir: _pl.Path,
 
     cpp_env = {**_os.environ}
     ctest = [
-        "ctest", "--output-on-failure", "--output-junit",
+        _CTEST, "--output-on-failure", "--output-junit",
         "results-single-gpu.xml"
     ]
 
@@ -461,7 +494,7 @@ def run_multi_gpu_tests(build_dir: _pl.Path, timeout=1500):
     cpp_env = {**_os.environ}
     # Utils tests
     mpi_utils_test = [
-        "mpirun",
+        _MPIRUN,
         "-n",
         "4",
         "--allow-run-as-root",
@@ -469,43 +502,34 @@ def run_multi_gpu_tests(build_dir: _pl.Path, timeout=1500):
     ]
     run_command(mpi_utils_test, cwd=tests_dir, env=cpp_env, timeout=300)
 
-    # TP2+PP2 tests fail for beam search
-    session_test = [
-        "mpirun", "-n", "4", "--allow-run-as-root", "gptSessionTest",
-        "--gtest_filter=*TP4*:*PP4*"
-    ]
-    run_command(session_test, cwd=tests_dir, env=cpp_env,
-                timeout=300)  # expecting ~250s
-
-    trt_model_test = [
-        "mpirun", "-n", "4", "--allow-run-as-root",
-        "batch_manager/trtGptModelRealDecoderTest", "--gtest_filter=*TP*:*PP*"
+    # Each binary needs its own mpirun launch: an MPI rank cannot be
+    # re-initialized by a second executable inside the same job.
+    llama_env = {**cpp_env, "RUN_LLAMA_MULTI_GPU": "true"}
+    multi_gpu_tests = [
+        # TP2+PP2 tests fail for beam search
+        ("4", "gptSessionTest", "*TP4*:*PP4*", cpp_env, 300),  # ~250s
+        ("4", "batch_manager/trtGptModelRealDecoderTest", "*TP*:*PP*", cpp_env,
+         timeout),  # ~1200s
+        # Executor test in leader mode
+        ("4", "executor/executorTest", "*LlamaExecutorTest*LeaderMode*",
+         llama_env, 1500),
+        # Executor test in orchestrator mode
+        ("1", "executor/executorTest", "*LlamaExecutorTest*OrchMode*",
+         llama_env, 1500),
     ]
-    run_command(trt_model_test, cwd=tests_dir, env=cpp_env,
-                timeout=timeout)  # expecting ~ 1200s
-
-    #Executor test in leader mode
-    new_env = cpp_env
-    new_env["RUN_LLAMA_MULTI_GPU"] = "true"
-    trt_model_test = [
-        "mpirun", "-n", "4", "--allow-run-as-root", "executor/executorTest",
-        "--gtest_filter=*LlamaExecutorTest*LeaderMode*"
-    ]
-    run_command(trt_model_test, cwd=tests_dir, env=new_env, timeout=1500)
-
-    #Executor test in orchestrator mode
-    trt_model_test = [
-        "mpirun", "-n", "1", "--allow-run-as-root", "executor/executorTest",
-        "--gtest_filter=*LlamaExecutorTest*OrchMode*"
-    ]
-    run_command(trt_model_test, cwd=tests_dir, env=new_env, timeout=1500)
+    for n_ranks, test_exe, gtest_filter, env, test_timeout in multi_gpu_tests:
+        test_cmd = [
+            _MPIRUN, "-n", n_ranks, "--allow-run-as-root", test_exe,
+            f"--gtest_filter={gtest_filter}"
+        ]
+        run_command(test_cmd, cwd=tests_dir, env=env, timeout=test_timeout)
 
 
 def run_benchmarks(python_exe: str, root_dir: _pl.Path, build_dir: _pl.Path,
                    resources_dir: _pl.Path):
 
     make_benchmarks = [
-        "cmake", "--build", ".", "--config", "Release", "-j", "--target",
+        _CMAKE, "--build", ".", "--config", "Release", "-j", "--target",
         "benchmarks"
     ]
     run_command(make_benchmarks, cwd=build_dir, timeout=300)
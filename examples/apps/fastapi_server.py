@@ -13,6 +13,8 @@ TIMEOUT_KEEP_ALIVE = 5  # seconds.
 TIMEOUT_TO_PREVENT_DEADLOCK = 1  # seconds.
 app = FastAPI()
 executor: Optional[GenerationExecutorWorker] = None
+# Pending (prompt, streaming, kwargs, future) tuples, drained by batcher().
+request_queue: Optional[asyncio.Queue] = None
 
 
 @app.get("/stats")
@@ -41,7 +43,9 @@ async def generate(request: Request) -> Response:
 
     prompt = request_dict.pop("prompt", "")
     streaming = request_dict.pop("streaming", False)
-    promise = executor.generate_async(prompt, streaming, **request_dict)
+    submitted = asyncio.get_running_loop().create_future()
+    await request_queue.put((prompt, streaming, request_dict, submitted))
+    promise = await submitted
     assert isinstance(promise, GenerationResult)
 
     async def stream_results() -> AsyncGenerator[bytes, None]:
@@ -56,18 +60,57 @@ async def generate(request: Request) -> Response:
     return JSONResponse({"text": promise.text})
 
 
+async def batcher(max_batch_size: int, batch_wait_ms: float):
+    """Submit the requests arriving in a short window together.
+
+    Requests arriving concurrently are grouped (up to `max_batch_size`, or
+    whatever arrived within `batch_wait_ms`) and handed to the executor in
+    the same scheduler tick. The batcher never awaits the generation
+    itself, so new arrivals can be submitted while earlier ones are running.
+    """
+    assert executor is not None and request_queue is not None
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await request_queue.get()]
+        deadline = loop.time() + batch_wait_ms / 1000
+        while len(batch) < max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(request_queue.get(),
+                                                    timeout))
+            except asyncio.TimeoutError:
+                break
+
+        for prompt, streaming, request_dict, submitted in batch:
+            if submitted.cancelled():
+                continue
+            try:
+                submitted.set_result(
+                    executor.generate_async(prompt, streaming, **request_dict))
+            except Exception as e:
+                submitted.set_exception(e)
+
+
 async def main(args):
-    global executor
+    global executor, request_queue
 
     with GenerationExecutorWorker(args.model_dir, args.tokenizer_type,
                                   args.max_beam_width) as executor:
         executor.block_subordinates()
+        request_queue = asyncio.Queue()
+        batcher_task = asyncio.create_task(
+            batcher(args.max_batch_size, args.batch_wait_ms))
         config = uvicorn.Config(app,
                                 host=args.host,
                                 port=args.port,
                                 log_level="info",
                                 timeout_keep_alive=TIMEOUT_KEEP_ALIVE)
-        await uvicorn.Server(config).serve()
+        try:
+            await uvicorn.Server(config).serve()
+        finally:
+            batcher_task.cancel()
 
 
 if __name__ == "__main__":
@@ -77,6 +120,15 @@ if __name__ == "__main__":
     parser.add_argument("--host", type=str, default=None)
     parser.add_argument("--port", type=int, default=8000)
     parser.add_argument("--max_beam_width", type=int, default=1)
+    parser.add_argument("--max_batch_size",
+                        type=int,
+                        default=32,
+                        help="Maximum number of requests submitted together")
+    parser.add_argument(
+        "--batch_wait_ms",
+        type=float,
+        default=1.0,
+        help="How long to wait for more requests before submitting a batch")
     args = parser.parse_args()
 
     asyncio.run(main(args))
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 import asyncio
+import json
 import os
-from typing import List, Optional, Union
+import socket
+import sys
+from typing import Iterable, List, Optional, Union
 
 import click
 import torch
@@ -11,8 +14,58 @@ from tensorrt_llm.hlapi.llm import KvCacheConfig, SamplingConfig
 from tensorrt_llm.hlapi.utils import get_device_count
 from tensorrt_llm.quantization import QuantAlgo
 
+try:
+    # uvloop schedules the many small generate_async coroutines with less overhead.
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
 # NOTE, Currently, the following examples are only available for LLaMA models.
 
+# A system prompt shared by all the prompts, its KV cache blocks are reused across the requests.
+system_prompt_option = click.option(
+    '--system_prompt',
+    type=str,
+    default=None,
+    help='The prefix shared by all the prompts.')
+
+# The KV cache blocks evicted from the GPU are offloaded to the host memory instead of being dropped.
+host_cache_option = click.option(
+    '--host_cache_gb',
+    type=float,
+    default=0,
+    help='The size in GiB of the host memory tier of the KV cache.')
+
+# The KV cache dominates the memory traffic of the decoding phase, quantizing it halves that traffic.
+KV_CACHE_QUANT_ALGOS = {
+    'fp16': None,
+    'int8': QuantAlgo.INT8,
+    'fp8': QuantAlgo.FP8,
+}
+
+kv_cache_dtype_option = click.option(
+    '--kv_cache_dtype',
+    type=click.Choice(['auto'] + list(KV_CACHE_QUANT_ALGOS)),
+    default=None,
+    help=
+    'The KV cache dtype, defaults to the one matching the weight quantization. "auto" picks fp8 when supported and '
+    'int8 otherwise, fp16 keeps it unquantized.')
+
+# Send the prompts to a running `run_llm_server` instead of loading the engine in this process.
+use_server_option = click.option(
+    '--use_server',
+    type=str,
+    default=None,
+    help='The Unix socket of a running run_llm_server to send the prompts to.')
+
+# The prompts are given as token ids, so the tokenizer is skipped on the way in.
+prompt_is_digit_option = click.option(
+    '--prompt_is_digit',
+    is_flag=True,
+    default=False,
+    help='Whether the prompt is a list of integers.')
+
 
 @click.group()
 def cli():
@@ -20,7 +73,10 @@ def cli():
 
 
 @click.command('run_llm_generate')
-@click.option('--prompt', type=str, default="What is LLM?")
+@click.option('--prompt',
+              type=str,
+              default="What is LLM?",
+              help='Newline-separated prompts, or @<file> with one per line.')
 @click.option('--model_dir', type=str, help='The directory of the model.')
 @click.option('--engine_dir',
               type=str,
@@ -34,10 +90,9 @@ def cli():
               type=int,
               default=1,
               help='The number of GPUs for Pipeline Parallel.')
-@click.option('--prompt_is_digit',
-              type=bool,
-              default=False,
-              help='Whether the prompt is a list of integers.')
+@prompt_is_digit_option
+@system_prompt_option
+@use_server_option
 def run_llm_generate(
     prompt: str,
     model_dir: str,
@@ -45,6 +100,8 @@ def run_llm_generate(
     tp_size: int = 1,
     pp_size: int = 1,
     prompt_is_digit: bool = False,
+    system_prompt: Optional[str] = None,
+    use_server: Optional[str] = None,
     end_id: int = 2,
 ):
     ''' Running LLM with arbitrary model formats including:
@@ -60,8 +117,16 @@ def run_llm_generate(
         engine_dir: The directory of the engine, if specified different than model_dir then it will save the engine to `engine_dir`.
         tp_size: The number of GPUs for Tensor Parallel.
         pp_size: The number of GPUs for Pipeline Parallel.
+        use_server: The Unix socket of a running `run_llm_server`, the other model options are ignored if specified.
     '''
 
+    if use_server:
+        prompts = parse_prompts(prompt, prompt_is_digit, system_prompt)
+        outputs = generate_with_server(use_server, prompts,
+                                       end_id if prompt_is_digit else None)
+        write_lines(f"OUTPUT: {output['text']}" for output in outputs)
+        return
+
     config = ModelConfig(model_dir)
     # Avoid the tp_size and pp_size setting override the ones loaded from built engine
     if tp_size > 1: config.parallel_config.tp_size = tp_size
@@ -75,19 +140,30 @@ def run_llm_generate(
     if config.parallel_config.world_size > 1:
         print(f'Running LLM with Tensor Parallel on {tp_size} GPUs.')
 
-    llm = LLM(config)
+    llm = LLM(config, kv_cache_config=make_kv_cache_config())
 
     if engine_dir and os.path.abspath(model_dir) != os.path.abspath(engine_dir):
         print(f"Saving engine to {engine_dir}...")
         llm.save(engine_dir)
 
-    prompts = parse_prompts(prompt, prompt_is_digit)
+    prompts = parse_prompts(prompt, prompt_is_digit, system_prompt)
+    if not prompt_is_digit:
+        warmup_system_prompt(llm, system_prompt)
+
+    sampling_config = make_sampling_config(prompt_is_digit, end_id)
 
-    sampling_config = SamplingConfig(end_id=end_id,
-                                     pad_id=end_id) if prompt_is_digit else None
+    # Identical prompts are generated only once and the outputs are scattered back.
+    unique_ids = {}
+    inverse = [
+        unique_ids.setdefault(
+            tuple(p) if prompt_is_digit else p, len(unique_ids))
+        for p in prompts
+    ]
+    unique_prompts = [list(p) if prompt_is_digit else p for p in unique_ids]
 
-    for output in llm.generate(prompts, sampling_config=sampling_config):
-        print("OUTPUT:", output)
+    # Submit all the prompts at once so that inflight batching can schedule them together.
+    outputs = llm.generate(unique_prompts, sampling_config=sampling_config)
+    write_lines(f"OUTPUT: {outputs[i]}" for i in inverse)
 
 
 @click.command('run_llm_generate_async_example')
@@ -104,11 +180,24 @@ def run_llm_generate(
               type=int,
               default=1,
               help='The number of GPUs for Pipeline Parallel.')
+@click.option(
+    '--max_concurrent',
+    type=int,
+    default=None,
+    help=
+    'The maximum number of in-flight requests, defaults to the max batch size.')
+@system_prompt_option
+@host_cache_option
+@kv_cache_dtype_option
 def run_llm_generate_async_example(prompt: str,
                                    model_dir: str,
                                    streaming: bool = False,
                                    tp_size: int = 1,
-                                   pp_size: int = 1):
+                                   pp_size: int = 1,
+                                   max_concurrent: Optional[int] = None,
+                                   system_prompt: Optional[str] = None,
+                                   host_cache_gb: float = 0,
+                                   kv_cache_dtype: Optional[str] = None):
     ''' Running LLM generation asynchronously. '''
 
     if get_device_count() < tp_size:
@@ -123,81 +212,172 @@ def run_llm_generate_async_example(prompt: str,
     # Avoid the tp_size and pp_size setting override the ones loaded from built engine
     if tp_size > 1: config.parallel_config.tp_size = tp_size
     if pp_size > 1: config.parallel_config.pp_size = pp_size
+    if not set_kv_cache_dtype(config, kv_cache_dtype):
+        return
 
     llm = LLM(config,
-              kv_cache_config=KvCacheConfig(free_gpu_memory_fraction=0.4))
-    prompts = parse_prompts(prompt, False)
-
-    async def task(prompt: str):
-        outputs = []
-        async for output in llm.generate_async(prompt, streaming=streaming):
-            outputs.append(output.text)
-        print(' '.join(outputs))
+              kv_cache_config=make_kv_cache_config(
+                  host_cache_size=int(host_cache_gb * 1024**3)))
+    prompts = parse_prompts(prompt, False, system_prompt)
+    warmup_system_prompt(llm, system_prompt)
+
+    # The chunks of concurrent requests would interleave, so only a single prompt is streamed to stdout as it is
+    # generated, the texts of several prompts are written whole once they are done
+    stream_to_stdout = streaming and len(prompts) == 1
+
+    async def task(prompt: str, semaphore: asyncio.Semaphore):
+        # Requests beyond what the engine could batch would only wait in Python
+        async with semaphore:
+            async for output in llm.generate_async(prompt, streaming=streaming):
+                if stream_to_stdout:
+                    # Only write the newly generated text, the output text is cumulative
+                    sys.stdout.buffer.write(output.text_diff.encode())
+                    sys.stdout.buffer.flush()
+        write_lines([''] if stream_to_stdout else [output.text])
 
     async def main():
-        tasks = [task(prompt) for prompt in prompts]
+        sys.stdout.flush()
+        semaphore = asyncio.Semaphore(max_concurrent or config.max_batch_size)
+        tasks = [task(prompt, semaphore) for prompt in prompts]
         await asyncio.gather(*tasks)
 
     asyncio.run(main())
 
 
+# The quantization picked by --quant_type=auto, the first entry supported by the GPU's compute capability wins.
+AUTO_QUANT_TYPES = [
+    ((9, 0), 'w4a8_awq'),  # 4-bit weights with the GEMMs on FP8 tensor cores
+    ((8, 9), 'fp8'),
+    ((8, 0), 'int8_sq'),
+]
+
+QUANT_ALGOS = {
+    'int4_awq': QuantAlgo.W4A16_AWQ,
+    'w4a8_awq': QuantAlgo.W4A8_AWQ,
+    'int8_sq': QuantAlgo.W8A8_SQ_PER_CHANNEL,
+    'fp8': QuantAlgo.FP8,
+}
+
+
 @click.command('run_llm_with_quantization')
 @click.option('--prompt', type=str, default="What is LLM?")
 @click.option('--model_dir', type=str, help='The directory of the model.')
 @click.option('--quant_type',
-              type=str,
+              type=click.Choice(['auto'] + list(QUANT_ALGOS)),
               default='int4_awq',
               help='The quantization type.')
-def run_llm_with_quantization(prompt: str, model_dir: str, quant_type: str):
+@click.option('--workload',
+              type=click.Choice(['latency', 'throughput']),
+              default='latency',
+              help='The workload to pick the quantization for.')
+@kv_cache_dtype_option
+@prompt_is_digit_option
+@system_prompt_option
+def run_llm_with_quantization(prompt: str,
+                              model_dir: str,
+                              quant_type: str,
+                              workload: str = 'latency',
+                              kv_cache_dtype: Optional[str] = None,
+                              prompt_is_digit: bool = False,
+                              system_prompt: Optional[str] = None,
+                              end_id: int = 2):
     ''' Running LLM with quantization.
-    quant_type could be 'int4_awq' or 'fp8'.
+    quant_type could be 'int4_awq', 'w4a8_awq', 'int8_sq', 'fp8', or 'auto' to pick the best one for the GPU.
+
+    INT4 AWQ only pays off for small-batch latency: the weights are dequantized to FP16 before every GEMM, which
+    makes it compute bound and slower than FP16 once the batch grows. For the 'throughput' workload the quantization
+    is overridden with W8A8 SmoothQuant on Ampere and FP8 on Ada/Hopper, so that the GEMMs run on INT8/FP8 tensor cores.
+
+    The KV cache is quantized along with the weights, FP8 for 'fp8' and 'w4a8_awq' and INT8 for the others.
+    --kv_cache_dtype overrides it, fp16 keeps the KV cache unquantized.
     '''
 
-    major, minor = torch.cuda.get_device_capability()
-    if not (major >= 8):
+    compute_capability = torch.cuda.get_device_capability()
+    if not (compute_capability >= (8, 0)):
         print("Quantization currently only supported on post Ampere")
         return
+    fp8_supported = compute_capability >= (8, 9)
+
+    if workload == 'throughput':
+        quant_type = 'fp8' if fp8_supported else 'int8_sq'
+    elif quant_type == 'auto':
+        quant_type = next(qt for cc, qt in AUTO_QUANT_TYPES
+                          if compute_capability >= cc)
 
-    if 'fp8' in quant_type:
-        if not (major > 8):
-            print("Hopper GPUs are required for fp8 quantization")
+    if quant_type in ('fp8', 'w4a8_awq'):
+        if not fp8_supported:
+            print("Ada or Hopper GPUs are required for fp8 quantization")
             return
+    if quant_type == 'w4a8_awq' and not (compute_capability >= (9, 0)):
+        print("Hopper GPUs are required for w4a8_awq quantization")
+        return
 
     config = ModelConfig(model_dir)
-    if quant_type == 'int4_awq':
-        config.quant_config.quant_algo = QuantAlgo.W4A16_AWQ
-    else:
-        config.quant_config.quant_algo = QuantAlgo.FP8
-        config.quant_config.kv_cache_quant_algo = QuantAlgo.FP8
+    config.quant_config.quant_algo = QUANT_ALGOS[quant_type]
+    if quant_type in ('fp8', 'w4a8_awq'):
         config.quant_config.exclude_modules = ["lm_head"]
+    if not set_kv_cache_dtype(config, kv_cache_dtype):
+        return
 
-    llm = LLM(config)
-    prompts = parse_prompts(prompt, False)
+    # Block reuse relies on the paged context FMHA, which is disabled for FP8.
+    kv_cache_config = make_kv_cache_config(
+        enable_block_reuse=config.quant_config.quant_algo is not QuantAlgo.FP8)
+    llm = LLM(config, kv_cache_config=kv_cache_config)
+    prompts = parse_prompts(prompt, prompt_is_digit, system_prompt)
+    if not prompt_is_digit:
+        warmup_system_prompt(llm, system_prompt)
 
-    for output in llm.generate(prompts):
-        print(output)
+    sampling_config = make_sampling_config(prompt_is_digit, end_id)
+    write_lines(
+        str(output)
+        for output in llm.generate(prompts, sampling_config=sampling_config))
 
 
 @click.command('run_llm_with_async_future')
 @click.option('--prompt', type=str, default="What is LLM?")
 @click.option('--model_dir', type=str, help='The directory of the model.')
-def run_llm_with_async_future(prompt: str, model_dir: str):
+@prompt_is_digit_option
+@system_prompt_option
+@host_cache_option
+@kv_cache_dtype_option
+@use_server_option
+def run_llm_with_async_future(prompt: str,
+                              model_dir: str,
+                              prompt_is_digit: bool = False,
+                              system_prompt: Optional[str] = None,
+                              host_cache_gb: float = 0,
+                              kv_cache_dtype: Optional[str] = None,
+                              use_server: Optional[str] = None,
+                              end_id: int = 2):
+    prompts = parse_prompts(prompt, prompt_is_digit, system_prompt)
+    if use_server:
+        outputs = generate_with_server(use_server, prompts,
+                                       end_id if prompt_is_digit else None)
+        write_lines(output['text'] for output in outputs)
+        return
+
     config = ModelConfig(model_dir)
+    if not set_kv_cache_dtype(config, kv_cache_dtype):
+        return
     llm = LLM(config,
-              kv_cache_config=KvCacheConfig(free_gpu_memory_fraction=0.4))
+              kv_cache_config=make_kv_cache_config(
+                  host_cache_size=int(host_cache_gb * 1024**3)))
 
-    prompts = parse_prompts(prompt)
+    if not prompt_is_digit:
+        warmup_system_prompt(llm, system_prompt)
+    sampling_config = make_sampling_config(prompt_is_digit, end_id)
     # The result of generate() is similar to a Future, it won't block the main thread, call .result() to explicitly wait for the result
-    for generation in llm.generate_async(prompts):
-        # .result() is a blocking call, call it when you want to wait for the result
-        output = generation.result()
-        print(output.text)
+    generations = llm.generate_async(prompts, sampling_config=sampling_config)
+    # .result() is a blocking call, call it when you want to wait for the result
+    write_lines(generation.result().text for generation in generations)
 
     # Similar to .result(), there is an async version of .result(), which is .aresult(), and it works with the generate_async().
-    async def task(prompt: str):
-        generation = llm.generate_async(prompt, streaming=False)
+    async def task(prompt: Union[str, List[int]]):
+        generation = llm.generate_async(prompt,
+                                        streaming=False,
+                                        sampling_config=sampling_config)
         output = await generation.aresult()
-        print(output.text)
+        write_lines([output.text])
 
     async def main():
         tasks = [task(prompt) for prompt in prompts]
@@ -213,9 +393,14 @@ def run_llm_with_async_future(prompt: str, model_dir: str):
               type=int,
               default=1,
               help='The number of GPUs for Auto Parallel.')
+@prompt_is_digit_option
+@system_prompt_option
 def run_llm_with_auto_parallel(prompt: str,
                                model_dir: str,
-                               world_size: int = 1):
+                               world_size: int = 1,
+                               prompt_is_digit: bool = False,
+                               system_prompt: Optional[str] = None,
+                               end_id: int = 2):
     ''' Running LLM with auto parallel enabled. '''
     if get_device_count() < world_size:
         print(
@@ -229,19 +414,196 @@ def run_llm_with_auto_parallel(prompt: str,
     config.parallel_config.auto_parallel = True
     config.parallel_config.world_size = world_size
 
-    llm = LLM(config)
-    prompts = parse_prompts(prompt)
+    llm = LLM(config, kv_cache_config=make_kv_cache_config())
+    prompts = parse_prompts(prompt, prompt_is_digit, system_prompt)
+    if not prompt_is_digit:
+        warmup_system_prompt(llm, system_prompt)
+
+    sampling_config = make_sampling_config(prompt_is_digit, end_id)
+    write_lines(
+        str(output)
+        for output in llm.generate(prompts, sampling_config=sampling_config))
+
+
+@click.command('run_llm_server')
+@click.option('--model_dir', type=str, help='The directory of the model.')
+@click.option('--socket_path',
+              type=str,
+              default='/tmp/trtllm.sock',
+              help='The Unix socket to serve on.')
+@host_cache_option
+def run_llm_server(model_dir: str,
+                   socket_path: str = '/tmp/trtllm.sock',
+                   host_cache_gb: float = 0):
+    ''' Serve the LLM on a Unix socket, the engine is loaded once and shared by the commands run with `--use_server`.
+
+    Each request is a JSON line {"prompts": [...], "end_id": <optional int>}, the response is a JSON line
+    {"outputs": [{"text": ..., "token_ids": ...}, ...]} in the order of the prompts, or {"error": ...} if the request
+    failed. The requests of all the clients are submitted with generate_async, so they are batched together by the
+    runtime.
+    '''
+    config = ModelConfig(model_dir)
+    llm = LLM(config,
+              kv_cache_config=make_kv_cache_config(
+                  host_cache_size=int(host_cache_gb * 1024**3)))
+
+    async def handle_client(reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter):
+        while line := await reader.readline():
+            # A failed request is reported to its client, the connection and the server stay up
+            try:
+                request = json.loads(line)
+                end_id = request.get('end_id')
+                sampling_config = SamplingConfig(
+                    end_id=end_id,
+                    pad_id=end_id) if end_id is not None else None
+                generations = [
+                    llm.generate_async(p, sampling_config=sampling_config)
+                    for p in request['prompts']
+                ]
+                outputs = [
+                    await generation.aresult() for generation in generations
+                ]
+                response = {
+                    'outputs': [{
+                        'text': output.text,
+                        'token_ids': output.token_ids
+                    } for output in outputs]
+                }
+            except Exception as e:
+                response = {'error': str(e)}
+            writer.write((json.dumps(response) + '\n').encode())
+            await writer.drain()
+        writer.close()
+
+    async def main():
+        remove_stale_socket(socket_path)
+        server = await asyncio.start_unix_server(handle_client,
+                                                 path=socket_path)
+        print(f"Serving {model_dir} on {socket_path}")
+        async with server:
+            await server.serve_forever()
 
-    for output in llm.generate(prompts):
-        print(output)
+    asyncio.run(main())
 
 
-def parse_prompts(prompt: str, is_digit: bool = False) -> Union[str, List[int]]:
-    ''' Process a single prompt. '''
+def remove_stale_socket(socket_path: str):
+    ''' Remove the socket file left over by a server which is gone, refuse to take over one that still answers. '''
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except FileNotFoundError:
+            return
+        except ConnectionRefusedError:
+            os.unlink(socket_path)
+            return
+    raise RuntimeError(f"Another server is already serving on {socket_path}")
+
+
+def generate_with_server(socket_path: str,
+                         prompts: Union[List[str], List[List[int]]],
+                         end_id: Optional[int] = None) -> List[dict]:
+    ''' Send the prompts to a running `run_llm_server` and wait for the outputs. '''
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        request = {'prompts': prompts, 'end_id': end_id}
+        sock.sendall((json.dumps(request) + '\n').encode())
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        raise RuntimeError(f"The server on {socket_path} closed the connection")
+    response = json.loads(line)
+    if 'error' in response:
+        raise RuntimeError(
+            f"The server failed the request: {response['error']}")
+    return response['outputs']
+
+
+def write_lines(lines: Iterable[str]):
+    ''' Write a batch of outputs to stdout with a single write and flush. '''
+    sys.stdout.flush()
+    sys.stdout.buffer.write(''.join(f"{line}\n" for line in lines).encode())
+    sys.stdout.buffer.flush()
+
+
+def set_kv_cache_dtype(config: ModelConfig,
+                       kv_cache_dtype: Optional[str] = None) -> bool:
+    ''' Set the KV cache quantization of the config, returns False if the GPU does not support it.
+    Without kv_cache_dtype the KV cache follows the weights: FP8 for the FP8 GEMMs, INT8 for AWQ and SmoothQuant, and
+    unquantized without weight quantization.
+    '''
+    quant_algo = config.quant_config.quant_algo
+    if kv_cache_dtype is None:
+        if quant_algo is None:
+            kv_cache_dtype = 'fp16'
+        elif quant_algo in (QuantAlgo.FP8, QuantAlgo.W4A8_AWQ):
+            kv_cache_dtype = 'fp8'
+        else:
+            kv_cache_dtype = 'int8'
+    if kv_cache_dtype != 'fp16':
+        fp8_supported = torch.cuda.get_device_capability() >= (8, 9)
+        if kv_cache_dtype == 'auto':
+            kv_cache_dtype = 'fp8' if fp8_supported else 'int8'
+        if kv_cache_dtype == 'fp8' and not fp8_supported:
+            print("Ada or Hopper GPUs are required for fp8 KV cache")
+            return False
+    config.quant_config.kv_cache_quant_algo = KV_CACHE_QUANT_ALGOS[
+        kv_cache_dtype]
+    return True
+
+
+def make_kv_cache_config(free_gpu_memory_fraction: float = 0.9,
+                         enable_block_reuse: bool = True,
+                         host_cache_size: int = 0) -> KvCacheConfig:
+    ''' The KV cache config shared by the examples, the blocks of the common prefixes are reused across requests.
+
+    With a non-zero `host_cache_size` (in bytes), the blocks evicted from the GPU are offloaded to a pinned host memory
+    pool, reusing them from there is cheaper than recomputing them. The pool needs bindings whose KvCacheConfig has a
+    `host_cache_size` field, the cpp Executor forwards it from there.
+    '''
+    kv_cache_config = KvCacheConfig(
+        free_gpu_memory_fraction=free_gpu_memory_fraction,
+        enable_block_reuse=enable_block_reuse)
+    if host_cache_size > 0:
+        if not hasattr(kv_cache_config, 'host_cache_size'):
+            raise RuntimeError(
+                "--host_cache_gb is not supported by the installed bindings, their KvCacheConfig has no host_cache_size"
+            )
+        kv_cache_config.host_cache_size = host_cache_size
+    return kv_cache_config
+
+
+def make_sampling_config(prompt_is_digit: bool,
+                         end_id: int = 2) -> Optional[SamplingConfig]:
+    ''' The end_id and pad_id are required when the prompts are token ids, otherwise the defaults of the tokenizer are used. '''
+    return SamplingConfig(end_id=end_id,
+                          pad_id=end_id) if prompt_is_digit else None
+
+
+def warmup_system_prompt(llm: LLM, system_prompt: Optional[str]):
+    ''' Run the system prompt once so that its KV cache blocks are ready to be reused by the real requests. '''
+    if not system_prompt:
+        return
+    sampling_config = llm.get_default_sampling_config()
+    sampling_config.max_new_tokens = 1
+    llm.generate([system_prompt], sampling_config=sampling_config)
+
+
+def parse_prompts(prompt: str,
+                  is_digit: bool = False,
+                  system_prompt: Optional[str] = None
+                  ) -> Union[List[str], List[List[int]]]:
+    ''' Process the prompts, one per line. A prompt starting with '@' is read from the file it names. '''
+    if prompt.startswith('@'):
+        with open(prompt[1:]) as f:
+            prompt = f.read()
+    prompts = [p for p in prompt.split('\n') if p.strip()]
     if is_digit:
-        return [[int(i) for i in prompt.split()]]
+        return [[int(i) for i in p.split()] for p in prompts]
+    elif system_prompt:
+        return [system_prompt + p for p in prompts]
     else:
-        return [prompt]
+        return prompts
 
 
 if __name__ == '__main__':
@@ -250,4 +612,5 @@ if __name__ == '__main__':
     cli.add_command(run_llm_with_quantization)
     cli.add_command(run_llm_with_async_future)
     cli.add_command(run_llm_with_auto_parallel)
+    cli.add_command(run_llm_server)
     cli()
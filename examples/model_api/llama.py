@@ -1,5 +1,9 @@
 import argparse
+import asyncio
+import functools
 import os
+import shutil
+import tempfile
 from pathlib import Path
 
 import tensorrt_llm
@@ -9,14 +13,54 @@ from tensorrt_llm.hlapi import SamplingConfig
 from tensorrt_llm.models import LLaMAForCausalLM
 
 
-def read_input():
+async def read_input():
     while (True):
-        input_text = input("<")
+        input_text = await asyncio.to_thread(input, "<")
         if input_text in ("q", "quit"):
             break
         yield input_text
 
 
+async def print_outputs(futures: asyncio.Queue, tokenizer):
+    while (future := await futures.get()) is not None:
+        output = await future.aresult()
+        print(f">{tokenizer.decode(output.token_ids)}")
+
+
+async def chat(executor: GenerationExecutor, sampling_config: SamplingConfig):
+    tokenizer = executor.tokenizer
+
+    # Repeated prompts are common in a chat session, keep their token ids around and submit them directly.
+    @functools.lru_cache(maxsize=256)
+    def encode(text: str):
+        return tuple(tokenizer.encode(text))
+
+    # Each prompt is submitted as soon as it is read, the outputs are printed in order by another task,
+    # so the next prompt can be read and tokenized while the previous one is still being generated.
+    futures = asyncio.Queue()
+    printer = asyncio.create_task(print_outputs(futures, tokenizer))
+    async for inp in read_input():
+        futures.put_nowait(
+            executor.generate_async(list(encode(inp)),
+                                    streaming=False,
+                                    sampling_config=sampling_config))
+    futures.put_nowait(None)
+    await printer
+
+
+def warmup(executor: GenerationExecutor, max_input_len: int):
+    ''' Run a short and a max_input_len long prompt once, so the first user prompt does not pay for the kernel
+    autotuning and the initial memory allocations. '''
+    tokenizer = executor.tokenizer
+    short_prompt = tokenizer.encode("warmup")
+    long_prompt = (short_prompt * max_input_len)[:max_input_len]
+    sampling_config = SamplingConfig(end_id=tokenizer.eos_token_id,
+                                     pad_id=tokenizer.pad_token_id,
+                                     max_new_tokens=1)
+    executor.generate([short_prompt, long_prompt],
+                      sampling_config=sampling_config)
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Llama single model example")
     parser.add_argument(
@@ -39,6 +83,32 @@ def parse_args():
         help=
         "Clean build the engine even if the engine_dir exists, be careful, this overwrites the engine_dir!!"
     )
+    parser.add_argument(
+        "--engine_only",
+        default=False,
+        action="store_true",
+        help=
+        "With -c, only rebuild the engine from the saved TRT-LLM checkpoint instead of converting the HF model again"
+    )
+    parser.add_argument(
+        "--fast_build",
+        default=False,
+        action="store_true",
+        help=
+        "Skip the TensorRT tactic search to build faster, the engine runs slower, not suggested for production"
+    )
+    parser.add_argument(
+        "--fused_mlp",
+        default=True,
+        action=argparse.BooleanOptionalAction,
+        help=
+        "Fuse the gate and fc GEMMs of the MLP, fewer kernel launches per decoding step"
+    )
+    parser.add_argument(
+        "--warmup",
+        default=True,
+        action=argparse.BooleanOptionalAction,
+        help="Run a short and a long prompt before reading the user input")
     return parser.parse_args()
 
 
@@ -49,23 +119,50 @@ def main():
     build_config = BuildConfig(max_input_len=256,
                                max_output_len=20,
                                max_batch_size=1)
-    # just for fast build, not best for production
-    build_config.builder_opt = 0
+    if args.fast_build:
+        # just for fast build, not best for production
+        build_config.builder_opt = 0
     build_config.plugin_config.gemm_plugin = "float16"
+    build_config.plugin_config.paged_kv_cache = True
+    build_config.plugin_config.use_paged_context_fmha = True
+    build_config.plugin_config.multi_block_mode = True
+    # The batch=1 decoding is bound by the kernel launches, one GEMM less per layer
+    build_config.use_fused_mlp = args.fused_mlp
 
+    # The converted TRT-LLM checkpoint is kept next to the engine, so rebuilding does not convert the HF model again
+    checkpoint_dir = args.engine_dir.with_name(args.engine_dir.name + "_ckpt")
     if args.clean_build or not args.engine_dir.exists():
         args.engine_dir.mkdir(exist_ok=True, parents=True)
         os.makedirs(args.engine_dir, exist_ok=True)
-        llama = LLaMAForCausalLM.from_hugging_face(args.hf_model_dir)
+        if not (checkpoint_dir / "config.json").exists() or (
+                args.clean_build and not args.engine_only):
+            # Convert into a temporary directory first, an interrupted conversion never leaves a partial checkpoint
+            converting_dir = tempfile.mkdtemp(dir=checkpoint_dir.parent,
+                                              prefix=checkpoint_dir.name)
+            # The safetensors weights are mmap'd and converted tensor by tensor, the .bin ones are converted
+            # one shard at a time, so the full HF model is never materialized in the host memory.
+            have_safetensors = any(
+                Path(args.hf_model_dir).glob("*.safetensors"))
+            llama = LLaMAForCausalLM.from_hugging_face(
+                args.hf_model_dir, load_by_shard=not have_safetensors)
+            llama.save_checkpoint(converting_dir)
+            # Release the converted weights before they are loaded again from the checkpoint
+            del llama
+            shutil.rmtree(checkpoint_dir, ignore_errors=True)
+            os.rename(converting_dir, checkpoint_dir)
+        llama = LLaMAForCausalLM.from_checkpoint(checkpoint_dir)
         engine = build(llama, build_config)
         engine.save(args.engine_dir)
 
     tokenizer_dir = args.hf_model_dir
     executor = GenerationExecutor.create(args.engine_dir, tokenizer_dir)
-    sampling_config = SamplingConfig(max_new_tokens=20)
-    for inp in read_input():
-        output = executor.generate(inp, sampling_config=sampling_config)
-        print(f">{output.text}")
+    # The end_id and pad_id are required since the prompts are submitted as token ids.
+    sampling_config = SamplingConfig(end_id=executor.tokenizer.eos_token_id,
+                                     pad_id=executor.tokenizer.pad_token_id,
+                                     max_new_tokens=20)
+    if args.warmup:
+        warmup(executor, build_config.max_input_len)
+    asyncio.run(chat(executor, sampling_config))
 
 
 main()
@@ -1,4 +1,6 @@
 import argparse
+import asyncio
+import functools
 import os
 from pathlib import Path
 
@@ -11,14 +13,54 @@ from tensorrt_llm.models.modeling_utils import QuantConfig
 from tensorrt_llm.quantization import QuantAlgo
 
 
-def read_input():
+async def read_input():
     while (True):
-        input_text = input("<")
+        input_text = await asyncio.to_thread(input, "<")
         if input_text in ("q", "quit"):
             break
         yield input_text
 
 
+async def print_outputs(futures: asyncio.Queue, tokenizer):
+    while (future := await futures.get()) is not None:
+        output = await future.aresult()
+        print(f">{tokenizer.decode(output.token_ids)}")
+
+
+async def chat(executor: GenerationExecutor, sampling_config: SamplingConfig):
+    tokenizer = executor.tokenizer
+
+    # Repeated prompts are common in a chat session, keep their token ids around and submit them directly.
+    @functools.lru_cache(maxsize=256)
+    def encode(text: str):
+        return tuple(tokenizer.encode(text))
+
+    # Each prompt is submitted as soon as it is read, the outputs are printed in order by another task,
+    # so the next prompt can be read and tokenized while the previous one is still being generated.
+    futures = asyncio.Queue()
+    printer = asyncio.create_task(print_outputs(futures, tokenizer))
+    async for inp in read_input():
+        futures.put_nowait(
+            executor.generate_async(list(encode(inp)),
+                                    streaming=False,
+                                    sampling_config=sampling_config))
+    futures.put_nowait(None)
+    await printer
+
+
+def warmup(executor: GenerationExecutor, max_input_len: int):
+    ''' Run a short and a max_input_len long prompt once, so the first user prompt does not pay for the kernel
+    autotuning and the initial memory allocations. '''
+    tokenizer = executor.tokenizer
+    short_prompt = tokenizer.encode("warmup")
+    long_prompt = (short_prompt * max_input_len)[:max_input_len]
+    sampling_config = SamplingConfig(end_id=tokenizer.eos_token_id,
+                                     pad_id=tokenizer.pad_token_id,
+                                     max_new_tokens=1)
+    executor.generate([short_prompt, long_prompt],
+                      sampling_config=sampling_config)
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Llama single model example")
     parser.add_argument(
@@ -41,6 +83,29 @@ def parse_args():
         help=
         "Clean build the engine even if the cache dir exists, be careful, this overwrites the cache dir!!"
     )
+    parser.add_argument(
+        "--fast_build",
+        default=False,
+        action="store_true",
+        help=
+        "Skip the TensorRT tactic search to build faster, the engine runs slower, not suggested for production"
+    )
+    parser.add_argument("--calib_batches",
+                        type=int,
+                        default=32,
+                        help="Number of samples used for the AWQ calibration")
+    parser.add_argument(
+        "--calib_batch_size",
+        type=int,
+        default=8,
+        help=
+        "Number of samples per calibration forward, larger batches keep the GPUs busier"
+    )
+    parser.add_argument(
+        "--warmup",
+        default=True,
+        action=argparse.BooleanOptionalAction,
+        help="Run a short and a long prompt before reading the user input")
     return parser.parse_args()
 
 
@@ -52,6 +117,12 @@ def main():
     build_config = BuildConfig(max_input_len=max_isl,
                                max_output_len=max_osl,
                                max_batch_size=max_batch_size)
+    if args.fast_build:
+        # just for fast build, not best for production
+        build_config.builder_opt = 0
+    build_config.plugin_config.paged_kv_cache = True
+    build_config.plugin_config.use_paged_context_fmha = True
+    build_config.plugin_config.multi_block_mode = True
     cache_dir = Path(args.cache_dir)
     checkpoint_dir = cache_dir / "trtllm_checkpoint"
     engine_dir = cache_dir / "trtllm_engine"
@@ -64,17 +135,21 @@ def main():
             LLaMAForCausalLM.quantize(args.hf_model_dir,
                                       checkpoint_dir,
                                       quant_config=quant_config,
-                                      calib_batches=1)
+                                      calib_batches=args.calib_batches,
+                                      calib_batch_size=args.calib_batch_size)
         llama = LLaMAForCausalLM.from_checkpoint(checkpoint_dir)
         engine = build(llama, build_config)
         engine.save(engine_dir)
 
     executor = GenerationExecutor.create(engine_dir, tokenizer_dir)
 
-    sampling_config = SamplingConfig(max_new_tokens=20)
-    for inp in read_input():
-        output = executor.generate(inp, sampling_config=sampling_config)
-        print(f">{output.text}")
+    # The end_id and pad_id are required since the prompts are submitted as token ids.
+    sampling_config = SamplingConfig(end_id=executor.tokenizer.eos_token_id,
+                                     pad_id=executor.tokenizer.pad_token_id,
+                                     max_new_tokens=20)
+    if args.warmup:
+        warmup(executor, max_isl)
+    asyncio.run(chat(executor, sampling_config))
 
 
 main()
@@ -1,18 +1,25 @@
 import asyncio
 import datetime
+import functools
+import itertools
+import pickle
 import secrets
+import struct
+import sys
 import traceback
+import weakref
 from abc import ABC, abstractmethod
+from collections import deque
 from dataclasses import dataclass
 from multiprocessing.connection import Client, Listener
 from pathlib import Path
-from queue import Queue
-from threading import Lock, Semaphore, Thread
-from typing import Any, Dict, Generator, List, Optional, Set, Tuple, Union
+from queue import Empty
+from threading import Condition, Event, Lock, RLock, Semaphore, Thread
+from typing import (Any, Callable, Dict, Generator, Iterable, List, Optional,
+                    Set, Tuple, Union)
 
 import numpy as np
 import torch
-from janus import Queue as AsyncQueue
 
 from tensorrt_llm._utils import mpi_comm, mpi_rank, mpi_world_size
 from tensorrt_llm.hlapi.mpi_session import (MpiPoolSession, MpiSession,
@@ -35,6 +42,210 @@ def has_event_loop() -> bool:
     return True
 
 
+class AsyncQueue:
+    ''' A queue fed from any thread, and consumed either synchronously or from the event loop it is created in.
+
+    A lighter replacement of janus.Queue: put() only appends under a lock, and the event loop is woken up only when a
+    coroutine is actually waiting in get(), instead of on every item. The sync_q and async_q views keep the janus
+    interface. With a maxlen, the queue is a ring buffer: put() never blocks and drops the oldest item when it is full.
+    get_all() takes every pending item at once by swapping the underlying deque, in a single lock acquisition.
+    '''
+
+    class AsyncView:
+
+        def __init__(self, queue: "AsyncQueue"):
+            self.put = queue.put
+            self.put_many = queue.put_many
+            self.get = queue.aget
+            self.get_all = queue.aget_all
+            self.empty = queue.empty
+
+    def __init__(self, maxlen: Optional[int] = None):
+        self._maxlen = maxlen
+        self._items = deque(maxlen=maxlen)
+        self._lock = Lock()
+        self._not_empty = Condition(self._lock)
+        # Without an event loop, only the sync get() can be used
+        self._loop = asyncio.get_running_loop() if has_event_loop() else None
+        # The futures of the coroutines waiting in aget() or aget_all(), each put() wakes up one of them
+        self._waiters: deque = deque()
+        self.sync_q = self
+        self.async_q = AsyncQueue.AsyncView(self)
+
+    @staticmethod
+    def _wake_up(*waiters: asyncio.Future):
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def put(self, item: Any):
+        with self._lock:
+            self._items.append(item)
+            self._not_empty.notify()
+            waiter = self._waiters.popleft() if self._waiters else None
+        if waiter is not None:
+            self._loop.call_soon_threadsafe(AsyncQueue._wake_up, waiter)
+
+    def put_many(self, items: List[Any]):
+        if not items:
+            return
+        with self._lock:
+            self._items.extend(items)
+            self._not_empty.notify(len(items))
+            waiters, self._waiters = self._waiters, deque()
+        if waiters:
+            self._loop.call_soon_threadsafe(AsyncQueue._wake_up, *waiters)
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: self._items, timeout):
+                raise Empty
+            return self._items.popleft()
+
+    def get_all(self, timeout: Optional[float] = None) -> deque:
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: self._items, timeout):
+                raise Empty
+            items, self._items = self._items, deque(maxlen=self._maxlen)
+            return items
+
+    async def _wait(self, waiter: asyncio.Future):
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    # Still pending, no put() counted on this waiter
+                    self._waiters.remove(waiter)
+                    waiter = None
+                except ValueError:
+                    # A put() already picked it, hand its wakeup over to the next waiter
+                    waiter = self._waiters.popleft() if (
+                        self._items and self._waiters) else None
+            if waiter is not None:
+                AsyncQueue._wake_up(waiter)
+            raise
+
+    async def aget(self) -> Any:
+        assert self._loop is not None
+        while True:
+            with self._lock:
+                if self._items:
+                    return self._items.popleft()
+                waiter = self._loop.create_future()
+                self._waiters.append(waiter)
+            await self._wait(waiter)
+
+    async def aget_all(self) -> deque:
+        assert self._loop is not None
+        while True:
+            with self._lock:
+                if self._items:
+                    items, self._items = self._items, deque(maxlen=self._maxlen)
+                    return items
+                waiter = self._loop.create_future()
+                self._waiters.append(waiter)
+            await self._wait(waiter)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def full(self) -> bool:
+        # put() never blocks
+        return False
+
+
+class QueuePool:
+    ''' Recycle the queues of the finished GenerationResults, instead of allocating a new queue (with its locks and
+    conditions) for every request. The GenerationResults themselves are not pooled, they are returned to the user and
+    stay alive after they are done. '''
+
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        # deque.append() and deque.pop() are atomic, the pool is shared by the threads without a lock
+        self._free = deque()
+
+    def rent(self) -> AsyncQueue:
+        ''' Get an empty queue bound to the running event loop if any, an AsyncQueue can't be used from another loop. '''
+        loop = asyncio.get_running_loop() if has_event_loop() else None
+        while True:
+            try:
+                queue = self._free.pop()
+            except IndexError:
+                return AsyncQueue()
+            if queue._loop is loop:
+                return queue
+
+    def give_back(self, queue: AsyncQueue):
+        ''' Return a queue which won't receive any message anymore. '''
+        if len(self._free) < self.capacity and queue.empty():
+            self._free.append(queue)
+
+
+result_queue_pool = QueuePool()
+
+
+@functools.lru_cache(maxsize=4096)
+def scalar_tensor(value: Union[int, float, tuple],
+                  dtype: torch.dtype) -> torch.Tensor:
+    ''' The single-value tensors of the InferenceRequest fields. Most of the requests share the same few values, so
+    the tensors are cached instead of being allocated for every request, they are only read by the runtime. '''
+    return torch.tensor([value], dtype=dtype)
+
+
+# The (end_id, pad_id) of the tokenizers, see special_token_ids()
+_special_token_ids = weakref.WeakKeyDictionary()
+
+
+def special_token_ids(tokenizer) -> Tuple[Optional[int], Optional[int]]:
+    ''' The (end_id, pad_id) of the tokenizer, the pad_id falls back to the end_id. They are looked up once per
+    tokenizer, eos_token_id and pad_token_id are properties converting the special tokens on every access in HF. '''
+    if tokenizer is None:
+        return None, None
+    ids = _special_token_ids.get(tokenizer)
+    if ids is None:
+        end_id, pad_id = tokenizer.eos_token_id, tokenizer.pad_token_id
+        ids = (end_id, end_id if pad_id is None else pad_id)
+        _special_token_ids[tokenizer] = ids
+    return ids
+
+
+def tensor_to_input_ids(ids: torch.Tensor) -> np.ndarray:
+    # A CPU int32 tensor is not copied, a GPU tensor is cast during its single device-to-host copy
+    ids = ids.detach().to("cpu", torch.int32)
+    return ids.reshape(-1).contiguous().numpy()
+
+
+# Convert the input ids to a flat contiguous int32 array, torch.from_numpy() shares its memory and no squeeze() is
+# needed later. Dispatched on the exact type of the input to save the isinstance() chain on every request.
+# The inputs which are already flat contiguous int32 arrays or tensors are used without any copy.
+INPUT_IDS_CONVERTERS = {
+    list: lambda ids: np.array(ids, dtype=np.int32).reshape(-1),
+    np.ndarray:
+    lambda ids: np.ascontiguousarray(ids.reshape(-1), dtype=np.int32),
+    torch.Tensor: tensor_to_input_ids,
+}
+
+# The fields of the SamplingConfig passed to the tllme.SamplingConfig of the requests
+EXECUTOR_SAMPLING_FIELDS = (
+    "beam_width",
+    "min_length",
+    "top_k",
+    "top_p",
+    "temperature",
+    "random_seed",
+    "beam_search_diversity_rate",
+    "early_stopping",
+    "frequency_penalty",
+    "length_penalty",
+    "presence_penalty",
+    "repetition_penalty",
+    "top_p_decay",
+    "top_p_min",
+    "top_p_reset_ids",
+)
+
+
 class GenerationRequest:
 
     def __init__(
@@ -47,21 +258,21 @@ class GenerationRequest:
         exclude_input_from_output: bool = False):
         if isinstance(ids_or_prompt, str):
             assert tokenizer is not None, "GenerationRequest constructor with str prompt requires a tokenizer argument"
-            self.input_ids = (tokenizer.encode(ids_or_prompt,
-                                               return_tensors="pt",
-                                               return_attention_mask=False).to(
-                                                   torch.int32).numpy())
+            self.input_ids = np.array(tokenizer.encode(ids_or_prompt),
+                                      dtype=np.int32)
         else:
-            if isinstance(ids_or_prompt, list):
-                self.input_ids = np.array(ids_or_prompt, dtype="int32")
-            elif isinstance(ids_or_prompt, torch.Tensor):
-                self.input_ids = ids_or_prompt.to(torch.int32).numpy()
-            elif isinstance(ids_or_prompt, np.ndarray):
-                self.input_ids = ids_or_prompt
-            else:
+            convert = INPUT_IDS_CONVERTERS.get(type(ids_or_prompt))
+            if convert is None:
+                # Subclasses such as np.memmap
+                convert = next(
+                    (convert
+                     for input_type, convert in INPUT_IDS_CONVERTERS.items()
+                     if isinstance(ids_or_prompt, input_type)), None)
+            if convert is None:
                 raise ValueError(
                     f"ids_or_prompt (={ids_or_prompt}) should be an instance of str, torch.Tensor, np.ndarray or list"
                 )
+            self.input_ids = convert(ids_or_prompt)
 
         self.tokenizer = tokenizer
         self.streaming = streaming
@@ -70,6 +281,35 @@ class GenerationRequest:
 
         self.id = -1
 
+    def __getstate__(self) -> dict:
+        # The tokenizer is not sent to the workers, which don't need it, saves communication time
+        state = self.__dict__.copy()
+        state["tokenizer"] = None
+        return state
+
+    @classmethod
+    def from_prompts_batch(
+            cls,
+            prompts: List[str],
+            tokenizer: TokenizerBase,
+            streaming: bool = True,
+            sampling_configs: Optional[List[Optional[SamplingConfig]]] = None,
+            exclude_input_from_output: bool = False
+    ) -> List["GenerationRequest"]:
+        ''' Create the requests of several str prompts, all the prompts are tokenized in a single call of the tokenizer
+        instead of one encode() per prompt. '''
+        batch_input_ids = tokenizer(prompts,
+                                    return_attention_mask=False)["input_ids"]
+        sampling_configs = sampling_configs or [None] * len(prompts)
+        return [
+            cls(np.array(input_ids, dtype=np.int32),
+                streaming,
+                tokenizer,
+                sampling_config=sampling_config,
+                exclude_input_from_output=exclude_input_from_output) for
+            input_ids, sampling_config in zip(batch_input_ids, sampling_configs)
+        ]
+
     def set_id(self, id):
         self.id = id
         return self
@@ -87,7 +327,9 @@ class GenerationRequest:
                 value = getattr(self.sampling_config, name, None)
                 value = value if value is not None else default
             if value is not None:
-                setattr(ir, name, torch.tensor([value], dtype=dtype))
+                if isinstance(value, list):
+                    value = tuple(value)
+                setattr(ir, name, scalar_tensor(value, dtype))
 
         top_k = self.sampling_config.top_k[
             0] if self.sampling_config.top_k is not None else None
@@ -101,9 +343,7 @@ class GenerationRequest:
         ] if self.sampling_config.max_new_tokens is not None else None
         min_length = self.sampling_config.min_length[
             0] if self.sampling_config.min_length is not None else None
-        end_id = self.tokenizer.eos_token_id if self.tokenizer is not None else None
-        pad_id = self.tokenizer.pad_token_id if self.tokenizer is not None else None
-        pad_id = end_id if pad_id is None else pad_id
+        end_id, pad_id = special_token_ids(self.tokenizer)
 
         set_property("beam_width")
         set_property("max_new_tokens", default=[32], value=max_new_tokens)
@@ -120,40 +360,22 @@ class GenerationRequest:
     def as_executor_request(self) -> tllme.Request:
         # SamplingConfig
         sampling_kwargs = {}
-
-        def set_property(name):
-            value = getattr(self.sampling_config, name, None)
+        sampling_config = self.sampling_config
+        for name in EXECUTOR_SAMPLING_FIELDS:
+            value = getattr(sampling_config, name, None)
             if value:
                 sampling_kwargs[name] = value[0] if isinstance(value,
                                                                list) else value
-
-        set_property("beam_width")
-        set_property("min_length")
-        set_property("top_k")
-        set_property("top_p")
-        set_property("temperature")
-        set_property("random_seed")
-        set_property("beam_search_diversity_rate")
-        set_property("early_stopping")
-        set_property("frequency_penalty")
-        set_property("length_penalty")
-        set_property("presence_penalty")
-        set_property("repetition_penalty")
-        set_property("top_p_decay")
-        set_property("top_p_min")
-        set_property("top_p_reset_ids")
         sampling_config = tllme.SamplingConfig(**sampling_kwargs)
         # Request
-        end_id = self.tokenizer.eos_token_id if self.tokenizer is not None else None
-        pad_id = self.tokenizer.pad_token_id if self.tokenizer is not None else None
-        pad_id = end_id if pad_id is None else pad_id
+        end_id, pad_id = special_token_ids(self.tokenizer)
 
         output_config = tllme.OutputConfig()
         # Don't repeat prompt in the generation output
         output_config.exclude_input_from_output = self.exclude_input_from_output
 
         request_kwargs = {
-            "input_token_ids": self.input_ids.squeeze().tolist(),
+            "input_token_ids": self.input_ids.tolist(),
             "max_new_tokens": self.sampling_config.max_new_tokens or 32,
             "streaming": self.streaming,
             "sampling_config": sampling_config,
@@ -185,13 +407,10 @@ class GenerationResult(GenerationOutput):
         self.tokenizer = tokenizer
         self.streaming = generation_request.streaming
 
-        if has_event_loop():
-            aqueue = AsyncQueue()
-            self.queue = aqueue.sync_q
-            self.aqueue = aqueue.async_q
-        else:
-            self.queue = Queue()
-            self.aqueue = None
+        # An AsyncQueue is used by the sync callers as well, it is lighter than a queue.Queue and can be drained at once
+        queue = result_queue_pool.rent()
+        self.queue = queue.sync_q
+        self.aqueue = queue.async_q if queue._loop is not None else None
 
         beam_width = generation_request.sampling_config.beam_width
 
@@ -200,6 +419,8 @@ class GenerationResult(GenerationOutput):
 
         self.logprobs = []
         self.last_text = ""
+        # The decoded texts of the beams, reset when new tokens arrive
+        self._texts: Optional[List[str]] = None
 
     @property
     def token_ids(self):
@@ -216,18 +437,34 @@ class GenerationResult(GenerationOutput):
             # Executor API format.
             new_ids = tensors
         else:
-            new_ids = tensors["output_ids"].squeeze(0).tolist()
-        for idx, beam_ids in enumerate(new_ids):
-            self._token_ids[idx] += beam_ids
+            # [1, beam_width, num_tokens], a single tolist() for all the beams
+            output_ids = tensors["output_ids"]
+            new_ids = output_ids.reshape(-1, output_ids.shape[-1]).tolist()
+        if not self.beam_search_enabled:
+            self._token_ids[0].extend(new_ids[0])
+        else:
+            for token_ids, beam_ids in zip(self._token_ids, new_ids):
+                token_ids.extend(beam_ids)
+        self._texts = None
 
-    def result_step(self, timeout: Optional[float] = None):
-        _, tensors, self._done, error = self.queue.get(timeout=timeout)
+    def handle_message(self, message: tuple):
+        _, tensors, self._done, error = message
         self.handle_generation_msg(tensors, error)
+        if self._done:
+            self.release_queue()
+
+    def result_step(self, timeout: Optional[float] = None):
+        self.handle_message(self.queue.get(timeout=timeout))
 
     async def aresult_step(self):
         assert self.aqueue is not None
-        _, tensors, self._done, error = await self.aqueue.get()
-        self.handle_generation_msg(tensors, error)
+        self.handle_message(await self.aqueue.get())
+
+    def release_queue(self):
+        # The last message has been received, the queue can serve another request
+        result_queue_pool.give_back(self.queue)
+        self.queue = None
+        self.aqueue = None
 
     @property
     def text_diff(self) -> str:
@@ -243,19 +480,25 @@ class GenerationResult(GenerationOutput):
     def text(self) -> Union[str, List[str]]:
         if self.tokenizer is None:
             return ''
-        texts = self.tokenizer.batch_decode(self._token_ids)
+        if self._texts is None:
+            self._texts = self.tokenizer.batch_decode(self._token_ids)
+        texts = self._texts
         if not self.beam_search_enabled:
             return texts[0]
         return texts
 
     def result(self, timeout: Optional[float] = None) -> "GenerationResult":
+        # The intermediate steps are not observed, take all the arrived messages at once
         while not self._done:
-            self.result_step(timeout)
+            for message in self.queue.get_all(timeout=timeout):
+                self.handle_message(message)
         return self
 
     async def aresult(self) -> "GenerationResult":
         while not self._done:
-            await self.aresult_step()
+            assert self.aqueue is not None
+            for message in await self.aqueue.get_all():
+                self.handle_message(message)
         return self
 
     def __iter__(self):
@@ -299,27 +542,31 @@ class GenerationResult(GenerationOutput):
 
 class GenerationExecutor(ABC):
     TERMINATE_REQUEST_ID = 0
+    # The number of iteration stats kept for get_stats()
+    STATS_QUEUE_SIZE = 1024
+    UINT64_MASK = (1 << 64) - 1
 
     def __init__(self):
-        self.id_counter = GenerationExecutor.TERMINATE_REQUEST_ID + 1
+        self.id_counter = itertools.count(
+            GenerationExecutor.TERMINATE_REQUEST_ID + 1)
         self.tokenizer = None
 
     def generate_id(self) -> int:
-        gen_id = self.id_counter
-
-        # underlying C type is uint64
-        uint64_max = 2**64 - 1
-        self.id_counter = (self.id_counter + 1) % uint64_max
-
-        if self.id_counter == GenerationExecutor.TERMINATE_REQUEST_ID:
-            self.id_counter += 1
-
+        # underlying C type is uint64, the TERMINATE_REQUEST_ID (0) is skipped when wrapping around
+        gen_id = next(self.id_counter) & GenerationExecutor.UINT64_MASK
+        if gen_id == GenerationExecutor.TERMINATE_REQUEST_ID:
+            gen_id = next(self.id_counter) & GenerationExecutor.UINT64_MASK
         return gen_id
 
     @abstractmethod
     def submit(self, request: GenerationRequest) -> GenerationResult:
         pass
 
+    def submit_many(
+            self, requests: List[GenerationRequest]) -> List[GenerationResult]:
+        """ Submit several requests, the executors which can batch the submissions override it. """
+        return [self.submit(request) for request in requests]
+
     def generate_async(
         self,
         prompt: Union[str, List[int], List[str], List[List[int]]],
@@ -345,17 +592,24 @@ class GenerationExecutor(ABC):
         else:
             sampling_config = [sampling_config] * len(prompt) if not isinstance(
                 sampling_config, list) else sampling_config
-            results = []
-            for idx, p in enumerate(prompt):
-                results.append(
-                    self.submit(
-                        GenerationRequest(
-                            p,
-                            streaming,
-                            tokenizer,
-                            sampling_config=sampling_config[idx],
-                            exclude_input_from_output=exclude_input_from_output)
-                    ))
+            if string_input:
+                requests = GenerationRequest.from_prompts_batch(
+                    prompt,
+                    tokenizer,
+                    streaming,
+                    sampling_configs=sampling_config,
+                    exclude_input_from_output=exclude_input_from_output)
+            else:
+                requests = [
+                    GenerationRequest(
+                        p,
+                        streaming,
+                        tokenizer,
+                        sampling_config=sampling_config[idx],
+                        exclude_input_from_output=exclude_input_from_output)
+                    for idx, p in enumerate(prompt)
+                ]
+            results = self.submit_many(requests)
         return results
 
     def generate(
@@ -372,13 +626,33 @@ class GenerationExecutor(ABC):
             streaming=streaming,
             sampling_config=sampling_config,
             exclude_input_from_output=exclude_input_from_output)
-        if isinstance(futures, GenerationRequest):
+        if isinstance(futures, GenerationResult):
             futures.result()
         else:
             for future in futures:
                 future.result()
+            GenerationExecutor.batched_decode(futures)
         return futures
 
+    @staticmethod
+    def batched_decode(results: List[GenerationResult]):
+        """ Decode the texts of several results with a single batch_decode() call per tokenizer instead of one call per
+            result, the texts are cached in the results until they receive new tokens. """
+        by_tokenizer: Dict[int, List[GenerationResult]] = {}
+        for result in results:
+            if result.tokenizer is not None and result._texts is None:
+                by_tokenizer.setdefault(id(result.tokenizer), []).append(result)
+
+        for group in by_tokenizer.values():
+            texts = group[0].tokenizer.batch_decode([
+                token_ids for result in group for token_ids in result._token_ids
+            ])
+            offset = 0
+            for result in group:
+                num_beams = len(result._token_ids)
+                result._texts = texts[offset:offset + num_beams]
+                offset += num_beams
+
     @abstractmethod
     def shutdown(self):
         pass
@@ -450,6 +724,47 @@ class GenerationExecutor(ABC):
             **worker_kwargs)
 
 
+class PendingRequests:
+    ''' The ids of the requests submitted to a worker and not completed yet.
+
+    complete() notifies a condition, wait_first_completed() sleeps on it until one of the awaited requests completes
+    instead of polling the set. '''
+
+    def __init__(self):
+        self._ids: Set[int] = set()
+        self._completed = Condition()
+
+    def add(self, req_id: int):
+        with self._completed:
+            self._ids.add(req_id)
+
+    def complete(self, req_ids: Iterable[int]):
+        with self._completed:
+            self._ids.difference_update(req_ids)
+            self._completed.notify_all()
+
+    def wait_first_completed(
+        self, futures: List[GenerationResult]
+    ) -> Generator[GenerationResult, None, None]:
+        by_id = {f.generation_request.id: f for f in futures}
+        wait_set = set(by_id)
+
+        # clear already-finished requests
+        for f in futures:
+            if f._done:
+                wait_set.remove(f.generation_request.id)
+                yield f
+
+        # wait remaining active requests, sleeping until one of them completes
+        while wait_set:
+            with self._completed:
+                while not (completed := wait_set - self._ids):
+                    self._completed.wait()
+            wait_set -= completed
+            for req_id in completed:
+                yield by_id[req_id]
+
+
 class GenerationExecutorWorker(GenerationExecutor):
 
     class WorkerExit(GeneratorExit):
@@ -479,18 +794,15 @@ class GenerationExecutorWorker(GenerationExecutor):
         self.tokenizer = tokenizer_factory(tokenizer)
 
         # NOTE: underscore variables are used for communication with the C++ runtime
-        self._requests: List[tllm.InferenceRequest] = []
+        # FIFO, deque.append() in submit() and deque.popleft() in fetch_requests() are atomic, no lock is needed
+        self._requests: deque[tllm.InferenceRequest] = deque()
         self._results: Dict[int, GenerationResult] = {}
         self._cancelled_ids: Set[int] = set()
-        self._pending: set = set()
-        if has_event_loop():
-            self._stats = AsyncQueue()
-            self.stats_queue = self._stats.sync_q
-            self.stats_aqueue = self._stats.async_q
-        else:
-            self._stats = Queue()
-            self.stats_queue = self._stats
-            self.stats_aqueue = None
+        self._pending = PendingRequests()
+        # Only the latest stats are kept, the runtime never waits for them to be consumed
+        self._stats = AsyncQueue(maxlen=GenerationExecutor.STATS_QUEUE_SIZE)
+        self.stats_queue = self._stats.sync_q
+        self.stats_aqueue = self._stats.async_q if has_event_loop() else None
         """
             Note: in single-node only (when using .block_subordinates()) the termination
             process is as follow:
@@ -574,22 +886,7 @@ class GenerationExecutorWorker(GenerationExecutor):
     def wait_first_completed(
         self, futures: List[GenerationResult]
     ) -> Generator[GenerationResult, None, None]:
-        wait_set = set(f.generation_request.id for f in futures)
-
-        # clear already-finished requests
-        for f in futures:
-            if f._done:
-                wait_set.remove(f.generation_request.id)
-                yield f
-
-        # wait remaining active requests
-        while len(wait_set) > 0:
-            req_id = wait_set.pop()
-
-            if req_id not in self._pending:
-                yield self._results[req_id]
-            else:
-                wait_set.add(req_id)
+        return self._pending.wait_first_completed(futures)
 
     def set_result_queue(self, queue):
         self.result_queue = queue
@@ -612,9 +909,10 @@ class GenerationExecutorWorker(GenerationExecutor):
         fetched = []
         if not self._block_subordinates or self.rank == 0:
             for _ in range(max_num_sequences):
-                if len(self._requests) == 0:
+                try:
+                    fetched.append(self._requests.popleft())
+                except IndexError:
                     break
-                fetched.append(self._requests.pop())
 
         if self._block_subordinates:
             self._termination_lock.acquire()
@@ -635,36 +933,58 @@ class GenerationExecutorWorker(GenerationExecutor):
         if self._block_subordinates and self.rank != 0:
             return
 
-        self.return_queue(req_id).put((req_id, {
-            t.name: t.tensor.numpy()
-            for t in tensors if t.tensor is not None
-        }, finished, err))
+        # Only the output_ids are consumed by the GenerationResult, the other tensors (sequence_length, logits, ...) are
+        # neither converted nor sent to the proxy
+        outputs = {}
+        for t in tensors:
+            if t.name == "output_ids" and t.tensor is not None:
+                outputs["output_ids"] = t.tensor.numpy()
+                break
+        self.return_queue(req_id).put((req_id, outputs, finished, err))
         if finished:
-            self._pending.remove(req_id)
+            self._pending.complete((req_id, ))
 
     def get_cancelled_ids(self) -> Set[int]:
         return self._cancelled_ids
 
     def handle_stats(self, stats: str):
-        while self.stats_queue.full():
-            self.stats_queue.get()
-
         self.stats_queue.put(stats)
 
     def __del__(self):
         self.shutdown()
 
 
+# The socket address, a path for a Unix domain socket or a (host, port) pair, and the authentication key
+FifoAddress = Tuple[Union[str, Tuple[str, int]], bytes]
+
+
 class Fifo:
+    ''' An authenticated point-to-point channel between the proxy and the rank0 worker.
+
+    The objects are pickled with protocol 5, the large contiguous buffers (such as the input_ids of a long prompt) are
+    sent out-of-band as raw frames following the pickle stream instead of being copied into it. '''
+
+    # Smaller buffers are cheaper to keep in the pickle stream than to send as a separate frame
+    OUT_OF_BAND_MIN_BYTES = 64 * 1024
 
-    def __init__(self, address: Tuple[str, int, bytes], *, is_server: bool):
-        self.address, self.authkey = (address[0], address[1]), address[2]
+    def __init__(self, address: FifoAddress, *, is_server: bool):
+        self.address, self.authkey = address
         self.is_server = is_server
         self.conn = None
         if is_server:
-            self.listener = Listener(self.address,
-                                     'AF_INET',
-                                     authkey=self.authkey)
+            # The socket family is deduced from the address
+            self.listener = Listener(self.address, authkey=self.authkey)
+
+    @staticmethod
+    def new_address() -> FifoAddress:
+        ''' The proxy and the rank0 worker run on the same node, a Unix domain socket is used on Linux, it skips the
+        TCP/IP stack of the loopback interface for every message. The socket lives in the abstract namespace: there is
+        no file to race for or to clean up, and it goes away with the listener. '''
+        # The key only feeds the HMAC challenge of the connection, 32 bytes match the size of a SHA-256 digest
+        authkey = secrets.token_bytes(32)
+        if sys.platform.startswith("linux"):
+            return "\0trtllm-fifo-" + secrets.token_hex(8), authkey
+        return ("127.0.0.1", find_free_port()), authkey
 
     def setup(self):
         if self.is_server:
@@ -675,12 +995,82 @@ class Fifo:
     def put(self, obj: Any):
         if self.conn is None:
             self.setup()
-        self.conn.send(obj)
+        buffers = []
+        # A false return value of the callback makes the buffer out-of-band
+        data = pickle.dumps(obj,
+                            protocol=5,
+                            buffer_callback=lambda buf: memoryview(buf).nbytes <
+                            Fifo.OUT_OF_BAND_MIN_BYTES or buffers.append(buf))
+        raws = [buf.raw() for buf in buffers]
+        # The sizes of the buffers let the receiver allocate them upfront
+        self.conn.send_bytes(
+            struct.pack(f"!I{len(raws)}Q", len(raws),
+                        *(raw.nbytes for raw in raws)) + data)
+        for raw in raws:
+            self.conn.send_bytes(raw)
 
     def get(self) -> Any:
         if self.conn is None:
             self.setup()
-        return self.conn.recv()
+        frame = self.conn.recv_bytes()
+        num_buffers, = struct.unpack_from("!I", frame)
+        sizes = struct.unpack_from(f"!{num_buffers}Q", frame, 4)
+        # The buffers are received into bytearrays, the arrays rebuilt on top of them stay writable
+        buffers = [bytearray(size) for size in sizes]
+        for buf in buffers:
+            self.conn.recv_bytes_into(buf)
+        return pickle.loads(memoryview(frame)[4 + 8 * num_buffers:],
+                            buffers=buffers)
+
+
+def run_with_pickled_kwargs(task, kwargs_blob: bytes):
+    ''' Run the task with keyword arguments pickled once by the submitter. MpiSession.submit() pickles its arguments
+    once per MPI worker, a bytes blob is copied instead of the configs and tokenizer being pickled again each time. '''
+    return task(**pickle.loads(kwargs_blob))
+
+
+class BatchedFifo:
+    ''' Send the items put from the runtime threads over a Fifo in batches, by a dedicated sender thread.
+
+    The items accumulated while the previous batch is being sent go out together as a single list, so no latency is
+    added while the Fifo keeps up, and the number of messages (and of wakeups of the receiver) drops when it doesn't.
+    '''
+
+    def __init__(self, fifo: Fifo):
+        self.fifo = fifo
+        self._items: List[Any] = []
+        self._ready = Condition()
+        self._closed = False
+        self._sender = Thread(target=self.sender_loop)
+        self._sender.start()
+
+    def put(self, obj: Any):
+        with self._ready:
+            self._items.append(obj)
+            self._ready.notify()
+
+    def put_many(self, objs: List[Any]):
+        with self._ready:
+            self._items.extend(objs)
+            self._ready.notify()
+
+    def sender_loop(self):
+        while True:
+            with self._ready:
+                self._ready.wait_for(lambda: self._items or self._closed)
+                batch, self._items = self._items, []
+                closed = self._closed
+            if batch:
+                self.fifo.put(batch)
+            if closed:
+                return
+
+    def close(self):
+        ''' Send the pending items and stop the sender thread, the Fifo can then be used directly again. '''
+        with self._ready:
+            self._closed = True
+            self._ready.notify()
+        self._sender.join()
 
 
 class GenerationExecutorProxy(GenerationExecutor):
@@ -696,11 +1086,9 @@ class GenerationExecutorProxy(GenerationExecutor):
         self.workers_started = False
         self.tokenizer = tokenizer_factory(workers_kwargs["tokenizer"])
 
-        request_queue_addr = ("127.0.0.1", find_free_port(),
-                              secrets.token_bytes(512))
+        request_queue_addr = Fifo.new_address()
         self.request_queue = Fifo(request_queue_addr, is_server=True)
-        result_queue_addr = ("127.0.0.1", find_free_port(),
-                             secrets.token_bytes(512))
+        result_queue_addr = Fifo.new_address()
         self.result_queue = Fifo(result_queue_addr, is_server=True)
 
         self._results: Dict[int, GenerationResult] = {}
@@ -715,16 +1103,22 @@ class GenerationExecutorProxy(GenerationExecutor):
         self.workers_kwargs.update({
             "request_queue_addr": request_queue_addr,
             "result_queue_addr": result_queue_addr,
+            # The requests reach the workers tokenized and the token ids are decoded here, the workers don't load the
+            # tokenizer again
+            "tokenizer": None,
         })
+        # Pickled once, reused for every worker and every restart
+        self._workers_kwargs_blob = pickle.dumps(self.workers_kwargs,
+                                                 protocol=5)
         self.dispatcher = Thread(target=self.dispatcher_thread)
 
     @print_traceback_on_error
     @staticmethod
     def workers_main(
         engine_dir: Path,
-        tokenizer: Union[str, Path, TokenizerBase],
-        request_queue_addr: Tuple[str, int, bytes],
-        result_queue_addr: Tuple[str, int, bytes],
+        tokenizer: Union[str, Path, TokenizerBase, None],
+        request_queue_addr: FifoAddress,
+        result_queue_addr: FifoAddress,
         max_beam_width: int = 1,
         executor_type: tllm.TrtGptModelType = tllm.TrtGptModelType.
         InflightFusedBatching,
@@ -766,27 +1160,37 @@ class GenerationExecutorProxy(GenerationExecutor):
         with ContextManager(executor) as executor:
             executor.block_subordinates()
             if mpi_rank() == 0:
-                executor.set_result_queue(result_queue)
+                batched_result_queue = BatchedFifo(result_queue)
+                executor.set_result_queue(batched_result_queue)
             while (req := request_queue.get()) is not None:
                 executor.submit(req)
 
         if mpi_rank() == 0:
+            batched_result_queue.close()
             result_queue.put(None)
 
     def dispatcher_thread(self):
         """ Collect centralized results from result queue and dispatch them in the
             correct GenerationResult queues. """
 
-        while (res := self.result_queue.get()) is not None:
-            id, tensors, finished, err = res
-            self._results[id].queue.put(
-                (id,
-                 {name: torch.tensor(value)
-                  for name, value in tensors.items()}, finished, err))
+        results = self._results
+        while (batch := self.result_queue.get()) is not None:
+            for req_id, tensors, finished, err in batch:
+                # Convert the output_ids to the token lists of the beams here, so that the consumer of the result
+                # (possibly an event loop) only has to append them
+                if tensors and "output_ids" in tensors:
+                    output_ids = tensors["output_ids"]
+                    tensors = output_ids.reshape(-1,
+                                                 output_ids.shape[-1]).tolist()
+                # The proxy doesn't need the finished results anymore, the user holds them
+                result = results.pop(
+                    req_id) if finished or err else results[req_id]
+                result.queue.put((req_id, tensors, finished, err))
 
     def start(self):
         self.mpi_futures = self.mpi_session.submit(
-            GenerationExecutorProxy.workers_main, **self.workers_kwargs)
+            run_with_pickled_kwargs, GenerationExecutorProxy.workers_main,
+            self._workers_kwargs_blob)
         self.workers_started = True
 
         # It will get the first failure status or get a success status if all ranks are successful
@@ -817,15 +1221,9 @@ class GenerationExecutorProxy(GenerationExecutor):
         req_id = self.generate_id()
         request.set_id(req_id)
 
-        tokenizer = request.tokenizer
-        result = GenerationResult(request, tokenizer)
+        result = GenerationResult(request, request.tokenizer)
         self._results[req_id] = result
-
-        # no need to send the tokenizer to the executor,
-        # saves communication time
-        request.tokenizer = None
         self.request_queue.put(request)
-        request.tokenizer = tokenizer
 
         return result
 
@@ -848,7 +1246,34 @@ class GenerationExecutorProxy(GenerationExecutor):
         return False
 
 
+# The batching type of the executor API for each model type of the GptManager
+BATCHING_TYPES = {
+    tllm.TrtGptModelType.V1: tllme.BatchingType.STATIC,
+    tllm.TrtGptModelType.InflightFusedBatching: tllme.BatchingType.INFLIGHT,
+}
+
+# The fields of the KvCacheConfig of the TrtGptModelOptionalParams forwarded to the tllme.KvCacheConfig
+KV_CACHE_CONFIG_FIELDS = (
+    "enable_block_reuse",
+    "max_tokens",
+    "max_attention_window",
+    "sink_token_length",
+    "free_gpu_memory_fraction",
+    "host_cache_size",
+)
+
+# The fields of the TrtGptModelOptionalParams forwarded as they are to the tllme.ExecutorConfig
+EXECUTOR_CONFIG_FIELDS = (
+    "enable_chunked_context",
+    "normalize_log_probs",
+)
+
+
 class ExecutorBindingsWorker(GenerationExecutor):
+    # The await_responses() timeout of the awaiter thread, it only bounds how long the running flag goes unchecked
+    AWAIT_TIMEOUT = datetime.timedelta(milliseconds=100)
+    # The period of the stats thread, the iteration stats are produced at the pace of the iterations anyway
+    STATS_INTERVAL = 0.05
 
     class WorkerExit(GeneratorExit):
         pass
@@ -870,8 +1295,13 @@ class ExecutorBindingsWorker(GenerationExecutor):
         self.engine = None
         self.tokenizer = tokenizer_factory(tokenizer)
         self._stats = None
-        self._results: Dict[int, GenerationResult] = {}
-        self._pending: set = set()
+        # The put() of the GenerationResult queue of the in-flight requests, bound once at submission and dropped with
+        # the last response. Unused when a centralized result queue is registered.
+        self._result_puts: Dict[int, Callable[[tuple], None]] = {}
+        # Held from the enqueue of the requests to their registration, and while the responses are dispatched, as the
+        # first responses may arrive in between
+        self._dispatch_lock = RLock()
+        self._pending = PendingRequests()
         self.result_queue = None
         self.rank = mpi_rank()
 
@@ -881,20 +1311,19 @@ class ExecutorBindingsWorker(GenerationExecutor):
             batching_type=self.convert_executor_type(executor_type),
             scheduler_config=scheduler_config)
         # Translate additional options from TrtGptModelOptionalParams
+        kv_cache_config = executor_config.kv_cache_config
+        # host_cache_size is missing from the older bindings, the default of the executor is used then
         config.kv_cache_config = tllme.KvCacheConfig(
-            enable_block_reuse=executor_config.kv_cache_config.
-            enable_block_reuse,
-            max_tokens=executor_config.kv_cache_config.max_tokens,
-            max_attention_window=executor_config.kv_cache_config.
-            max_attention_window,
-            sink_token_length=executor_config.kv_cache_config.sink_token_length,
-            free_gpu_memory_fraction=executor_config.kv_cache_config.
-            free_gpu_memory_fraction)
+            **{
+                name: getattr(kv_cache_config, name)
+                for name in KV_CACHE_CONFIG_FIELDS
+                if hasattr(kv_cache_config, name)
+            })
         if executor_config.device_ids:
             config.parallel_config = tllme.ParallelConfig(
                 device_ids=executor_config.device_ids)
-        config.enable_chunked_context = executor_config.enable_chunked_context
-        config.normalize_log_probs = executor_config.normalize_log_probs
+        for name in EXECUTOR_CONFIG_FIELDS:
+            setattr(config, name, getattr(executor_config, name))
         if executor_config.decoding_mode:
             config.decoding_mode = self.convert_decoding_mode(
                 executor_config.decoding_mode)
@@ -903,23 +1332,23 @@ class ExecutorBindingsWorker(GenerationExecutor):
                                      tllme.ModelType.DECODER_ONLY,
                                      executor_config=config)
         self.awaiter_thread = Thread(target=self.awaiter_loop)
+        self.stats_thread = Thread(target=self.stats_loop)
+        self._stopped = Event()
         self.running = True
 
-    def convert_executor_type(self, executor_type):
-        batching_type_map = {
-            tllm.TrtGptModelType.V1: tllme.BatchingType.STATIC,
-            tllm.TrtGptModelType.InflightFusedBatching:
-            tllme.BatchingType.INFLIGHT,
-        }
-        assert executor_type in batching_type_map, f"executor_type={executor_type} is not supported."
-        return batching_type_map[executor_type]
+    @staticmethod
+    def convert_executor_type(executor_type):
+        assert executor_type in BATCHING_TYPES, f"executor_type={executor_type} is not supported."
+        return BATCHING_TYPES[executor_type]
 
-    def convert_decoding_mode(self, decoding_mode):
+    @staticmethod
+    def convert_decoding_mode(decoding_mode):
+        top_k, top_p = decoding_mode.is_top_k(), decoding_mode.is_top_p()
         if decoding_mode.is_none():
             return tllme.DecodingMode.NONE
-        elif decoding_mode.is_top_k() and not decoding_mode.is_top_p():
+        elif top_k and not top_p:
             return tllme.DecodingMode.TOP_K
-        elif decoding_mode.is_top_p() and not decoding_mode.is_top_k():
+        elif top_p and not top_k:
             return tllme.DecodingMode.TOP_P
         elif decoding_mode.is_beam_search():
             return tllme.DecodingMode.BEAM_SEARCH
@@ -932,84 +1361,131 @@ class ExecutorBindingsWorker(GenerationExecutor):
     def create_stats_queue(self):
         # Stats queue is created during first submission to ensure event loop exists if it is needed.
         if not self._stats:
-            if has_event_loop():
-                self._stats = AsyncQueue()
-                self.stats_queue = self._stats.sync_q
-                self.stats_aqueue = self._stats.async_q
-            else:
-                self._stats = Queue()
-                self.stats_queue = self._stats
-                self.stats_aqueue = None
+            # Only the latest stats are kept, the awaiter thread never waits for them to be consumed
+            self._stats = AsyncQueue(maxlen=GenerationExecutor.STATS_QUEUE_SIZE)
+            self.stats_queue = self._stats.sync_q
+            self.stats_aqueue = self._stats.async_q if has_event_loop(
+            ) else None
 
     def set_result_queue(self, queue):
-        self.result_queue = queue
-
-    def return_queue(self, req_id: int):
-        """ If a centralized result queue is registered (used for communication with the proxy)
-            send the message there.
-            Otherwise, push the result directly in the GenerationResult queue.
+        """ Register a centralized result queue (used for communication with the proxy), the responses are sent there
+            with put_many() instead of being pushed directly in the GenerationResult queues. The list of the ids of
+            the enqueued requests is put there as well, ahead of their responses.
         """
-
-        if self.result_queue is not None:
-            return self.result_queue
-        return self._results[req_id].queue
+        self.result_queue = queue
 
     def start_awaiter_thread(self):
         if self.engine.can_enqueue_requests(
         ) and not self.awaiter_thread.is_alive():
             self.awaiter_thread.start()
+            self.stats_thread.start()
 
     def awaiter_loop(self):
         """ Gets responses from executor and places in the return queue."""
+        # await_responses() returns as soon as a response is ready
         while self.running:
             # Get responses and place in queue.
-            for response in self.engine.await_responses(
-                    timeout=datetime.timedelta(milliseconds=100)):
-                req_id = response.request_id
-                if response.has_error():
-                    self.return_queue(req_id).put(
-                        (req_id, None, None, response.error_msg))
-                else:
-                    self.return_queue(req_id).put(
-                        (response.request_id, response.result.output_token_ids,
-                         response.result.is_final, None))
-                    if response.result.is_final:
-                        self._pending.remove(req_id)
-            # Get stats and place in queue.
-            for stats in self.engine.get_latest_iteration_stats():
-                while self.stats_queue.full():
-                    self.stats_queue.get()
-                self.stats_queue.put(stats.to_json_str())
-
-    def submit(self, request: GenerationRequest) -> GenerationResult:
+            responses = self.engine.await_responses(
+                timeout=ExecutorBindingsWorker.AWAIT_TIMEOUT)
+            if responses:
+                self.dispatch_responses(responses)
+
+    def stats_loop(self):
+        """ Gets the iteration stats from executor and places them in the stats queue, apart from the responses. """
+        while not self._stopped.wait(ExecutorBindingsWorker.STATS_INTERVAL):
+            # They are serialized only if get_stats() is called for them
+            self.stats_queue.put_many(self.engine.get_latest_iteration_stats())
+
+    def dispatch_responses(self, responses: List["tllme.Response"]):
+        """ Convert all the responses of an await_responses() call first, then hand them over in bulk: a single
+            put_many() to the proxy and a single notification of the completed requests. """
+        messages = []
+        completed = []
+        for response in responses:
+            req_id = response.request_id
+            if response.has_error():
+                messages.append((req_id, None, None, response.error_msg))
+                # An error ends the request as well
+                completed.append(req_id)
+            else:
+                result = response.result
+                is_final = result.is_final
+                messages.append(
+                    (req_id, result.output_token_ids, is_final, None))
+                if is_final:
+                    completed.append(req_id)
+
+        with self._dispatch_lock:
+            if self.result_queue is not None:
+                self.result_queue.put_many(messages)
+            else:
+                result_puts = self._result_puts
+                for message in messages:
+                    req_id, _, is_final, error = message
+                    put = result_puts.pop(
+                        req_id) if is_final or error else result_puts[req_id]
+                    put(message)
+        if completed:
+            self._pending.complete(completed)
+
+    def enqueue(self, request: GenerationRequest) -> int:
         """
-            Low-level API to the executor. Return a "future" GenerationResult which can be waited.
+            Enqueue the request in the executor and return its id, without creating a GenerationResult for it.
+            Used when the responses are sent to the centralized result queue.
         """
+        return self.enqueue_many([request])[0]
+
+    def enqueue_many(self, requests: List[GenerationRequest]) -> List[int]:
+        """ Same as enqueue() for several requests, which are passed to the executor in a single call. """
         if self.rank != 0:
             raise NotImplementedError("Only rank 0 can submit requests.")
         self.create_stats_queue()
         self.start_awaiter_thread()
-        req_id = self.engine.enqueue_request(request.as_executor_request())
-        request.set_id(req_id)
+        with self._dispatch_lock:
+            req_ids = self.engine.enqueue_requests(
+                [request.as_executor_request() for request in requests])
+            for request, req_id in zip(requests, req_ids):
+                request.set_id(req_id)
+                self._pending.add(req_id)
+            if self.result_queue is not None:
+                # The ids precede any response of the requests
+                self.result_queue.put(req_ids)
+        return req_ids
 
-        result = GenerationResult(request, request.tokenizer)
-        self._results[req_id] = result
-        self._pending.add(req_id)
-        return result
+    def submit(self, request: GenerationRequest) -> GenerationResult:
+        """
+            Low-level API to the executor. Return a "future" GenerationResult which can be waited.
+        """
+        return self.submit_many([request])[0]
+
+    def submit_many(
+            self, requests: List[GenerationRequest]) -> List[GenerationResult]:
+        results = [
+            GenerationResult(request, request.tokenizer) for request in requests
+        ]
+        with self._dispatch_lock:
+            req_ids = self.enqueue_many(requests)
+            if self.result_queue is None:
+                for result, req_id in zip(results, req_ids):
+                    self._result_puts[req_id] = result.queue.put
+        return results
 
     def get_stats(self):
-        return self.stats_queue.get()
+        return self.stats_queue.get().to_json_str()
 
     async def aget_stats(self):
         assert self.stats_aqueue is not None
-        return await self.stats_aqueue.get()
+        return (await self.stats_aqueue.get()).to_json_str()
 
     def shutdown(self):
         if self.engine is not None:
             self.running = False
+            self._stopped.set()
             if self.engine.can_enqueue_requests():
                 if self.awaiter_thread.is_alive():
                     self.awaiter_thread.join()
+                if self.stats_thread.is_alive():
+                    self.stats_thread.join()
             self.engine.shutdown()
             self.engine = None
 
@@ -1032,22 +1508,7 @@ class ExecutorBindingsWorker(GenerationExecutor):
     def wait_first_completed(
         self, futures: List[GenerationResult]
     ) -> Generator[GenerationResult, None, None]:
-        wait_set = set(f.generation_request.id for f in futures)
-
-        # clear already-finished requests
-        for f in futures:
-            if f._done:
-                wait_set.remove(f.generation_request.id)
-                yield f
-
-        # wait remaining active requests
-        while len(wait_set) > 0:
-            req_id = wait_set.pop()
-
-            if req_id not in self._pending:
-                yield self._results[req_id]
-            else:
-                wait_set.add(req_id)
+        return self._pending.wait_first_completed(futures)
 
 
 class ExecutorBindingsProxy(GenerationExecutor):
@@ -1061,22 +1522,28 @@ class ExecutorBindingsProxy(GenerationExecutor):
         super().__init__()
 
         self.workers_started = False
+
+        # A single-rank engine needs neither the MPI workers nor the channels to them, the executor runs in this process
+        self.worker: Optional[ExecutorBindingsWorker] = None
+        if model_world_size == 1 and mpi_session is None:
+            self.worker = ExecutorBindingsWorker(**workers_kwargs)
+            self.tokenizer = self.worker.tokenizer
+            return
+
         self.tokenizer = tokenizer_factory(workers_kwargs["tokenizer"])
 
-        request_queue_addr = ("127.0.0.1", find_free_port(),
-                              secrets.token_bytes(512))
+        request_queue_addr = Fifo.new_address()
         self.request_queue = Fifo(request_queue_addr, is_server=True)
 
-        # Return request id back to dispatcher
-        request_id_queue_addr = ("127.0.0.1", find_free_port(),
-                                 secrets.token_bytes(512))
-        self.request_id_queue = Fifo(request_id_queue_addr, is_server=True)
-
-        result_queue_addr = ("127.0.0.1", find_free_port(),
-                             secrets.token_bytes(512))
+        # The request ids are sent back on the result queue, ahead of the responses of the requests
+        result_queue_addr = Fifo.new_address()
         self.result_queue = Fifo(result_queue_addr, is_server=True)
 
         self._results: Dict[int, GenerationResult] = {}
+        # The results of the submissions waiting for their ids, in the order of the submissions, which is the order of
+        # the ids sent back by the worker
+        self._awaiting_ids: deque[List[GenerationResult]] = deque()
+        self._ids_assigned = Condition()
 
         if mpi_session is None:
             self.mpi_session = MpiPoolSession(n_workers=model_world_size)
@@ -1087,19 +1554,23 @@ class ExecutorBindingsProxy(GenerationExecutor):
         self.workers_kwargs = workers_kwargs
         self.workers_kwargs.update({
             "request_queue_addr": request_queue_addr,
-            "request_id_queue_addr": request_id_queue_addr,
             "result_queue_addr": result_queue_addr,
+            # The requests reach the workers tokenized and the token ids are decoded here, the workers don't load the
+            # tokenizer again
+            "tokenizer": None,
         })
+        # Pickled once, reused for every worker and every restart
+        self._workers_kwargs_blob = pickle.dumps(self.workers_kwargs,
+                                                 protocol=5)
         self.dispatcher = Thread(target=self.dispatcher_thread)
 
     @print_traceback_on_error
     @staticmethod
     def workers_main(
         engine_dir: Path,
-        tokenizer: Union[str, Path, TokenizerBase],
-        request_queue_addr: Tuple[str, int, bytes],
-        request_id_queue_addr: Tuple[str, int, bytes],
-        result_queue_addr: Tuple[str, int, bytes],
+        tokenizer: Union[str, Path, TokenizerBase, None],
+        request_queue_addr: FifoAddress,
+        result_queue_addr: FifoAddress,
         max_beam_width: int = 1,
         executor_type: tllm.TrtGptModelType = tllm.TrtGptModelType.
         InflightFusedBatching,
@@ -1112,7 +1583,6 @@ class ExecutorBindingsProxy(GenerationExecutor):
 
         if mpi_rank() == 0:
             request_queue = Fifo(request_queue_addr, is_server=False)
-            request_id_queue = Fifo(request_id_queue_addr, is_server=False)
             result_queue = Fifo(result_queue_addr, is_server=False)
 
         # Only the failure on rank0 can be captured here. All the non-rank0 process will hang once the executor runtime
@@ -1134,11 +1604,16 @@ class ExecutorBindingsProxy(GenerationExecutor):
 
         with ContextManager(executor) as executor:
             if mpi_rank() == 0:
-                executor.set_result_queue(result_queue)
-                while (req := request_queue.get()) is not None:
-                    result = executor.submit(req)
-                    request_id_queue.put(result.generation_request.id)
-
+                batched_result_queue = BatchedFifo(result_queue)
+                executor.set_result_queue(batched_result_queue)
+                while (requests := request_queue.get()) is not None:
+                    # The GenerationResults live in the proxy, none is created here. The ids of the requests are sent
+                    # back on the result queue.
+                    executor.enqueue_many(requests)
+
+                # The awaiter thread is stopped by the shutdown, make sure no response is put after the close
+                executor.shutdown()
+                batched_result_queue.close()
                 result_queue.put(None)
             else:
                 executor.block_subordinates()
@@ -1147,13 +1622,35 @@ class ExecutorBindingsProxy(GenerationExecutor):
         """ Collect centralized results from result queue and dispatch them in the
             correct GenerationResult queues. """
 
-        while (res := self.result_queue.get()) is not None:
-            req_id = res[0]
-            self._results[req_id].queue.put(res)
+        results = self._results
+        while (batch := self.result_queue.get()) is not None:
+            # The messages of a request are put at once, so its consumer (possibly an event loop in another thread) is
+            # woken up once per batch rather than once per message
+            messages_by_id: Dict[int, List[tuple]] = {}
+            for res in batch:
+                if isinstance(res, list):
+                    # The ids of the oldest pending submission
+                    self.assign_ids(res)
+                else:
+                    messages_by_id.setdefault(res[0], []).append(res)
+            for req_id, messages in messages_by_id.items():
+                _, _, finished, err = messages[-1]
+                # The proxy doesn't need the finished results anymore, the user holds them
+                result = results.pop(
+                    req_id) if finished or err else results[req_id]
+                result.queue.put_many(messages)
+
+    def assign_ids(self, req_ids: List[int]):
+        with self._ids_assigned:
+            for result, req_id in zip(self._awaiting_ids.popleft(), req_ids):
+                result.generation_request.set_id(req_id)
+                self._results[req_id] = result
+            self._ids_assigned.notify_all()
 
     def start(self):
         self.mpi_futures = self.mpi_session.submit(
-            ExecutorBindingsProxy.workers_main, **self.workers_kwargs)
+            run_with_pickled_kwargs, ExecutorBindingsProxy.workers_main,
+            self._workers_kwargs_blob)
         self.workers_started = True
         ack = self.result_queue.get()
         if not ack:
@@ -1161,6 +1658,9 @@ class ExecutorBindingsProxy(GenerationExecutor):
         self.dispatcher.start()
 
     def shutdown(self):
+        if self.worker is not None:
+            self.worker.shutdown()
+            return
         if not self.workers_started:
             return
         self.request_queue.put(None)
@@ -1175,30 +1675,43 @@ class ExecutorBindingsProxy(GenerationExecutor):
             Low-level API to the executor. Return a "future" GenerationResult which can be waited.
             Forwards the request to the workers through the request queue.
         """
+        if self.worker is not None:
+            return self.worker.submit(request)
+        return self.submit_many([request])[0]
+
+    def submit_many(
+            self, requests: List[GenerationRequest]) -> List[GenerationResult]:
+        """
+            Forward several requests to the workers in a single message, their ids come back in a single message.
+        """
+        if self.worker is not None:
+            return self.worker.submit_many(requests)
+        if not requests:
+            return []
         if not self.workers_started:
             self.start()
 
-        tokenizer = request.tokenizer
-        # no need to send the tokenizer to the executor,
-        # saves communication time
-        request.tokenizer = None
-        self.request_queue.put(request)
-
-        # Await req id.
-        req_id = self.request_id_queue.get()
-        request.set_id(req_id)
-
-        result = GenerationResult(request, tokenizer)
-        self._results[req_id] = result
-        request.tokenizer = tokenizer
-
-        return result
+        results = [
+            GenerationResult(request, request.tokenizer) for request in requests
+        ]
+        with self._ids_assigned:
+            # Submitted under the lock, so that the submissions are queued in the order the worker receives them
+            self._awaiting_ids.append(results)
+            self.request_queue.put(requests)
+            # Await req ids, the dispatcher registers the results before it dispatches their first responses
+            self._ids_assigned.wait_for(
+                lambda: results[-1].generation_request.id != -1)
+        return results
 
     def get_stats(self):
+        if self.worker is not None:
+            return self.worker.get_stats()
         # TODO: https://jirasw.nvidia.com/browse/TRTLLM-514
         pass
 
     async def aget_stats(self):
+        if self.worker is not None:
+            return await self.worker.aget_stats()
         # TODO: https://jirasw.nvidia.com/browse/TRTLLM-514
         pass
 
@@ -12,30 +12,72 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from .baichuan.model import BaichuanForCausalLM
-from .bert.model import (BertForQuestionAnswering,
-                         BertForSequenceClassification, BertModel)
-from .bloom.model import BloomForCausalLM, BloomModel
-from .chatglm.model import ChatGLMForCausalLM, ChatGLMModel
-from .cogvlm.model import CogVLMForCausalLM
-from .dbrx.model import DbrxForCausalLM
-from .enc_dec.model import DecoderModel, EncoderModel, WhisperEncoder
-from .falcon.model import FalconForCausalLM, FalconModel
-from .gemma.model import GemmaForCausalLM
-from .gpt.model import GPTForCausalLM, GPTModel
-from .gptj.model import GPTJForCausalLM, GPTJModel
-from .gptneox.model import GPTNeoXForCausalLM, GPTNeoXModel
-from .llama.model import LLaMAForCausalLM, LLaMAModel
-from .mamba.model import MambaForCausalLM
-from .medusa.model import MedusaForCausalLm
+import importlib
+from collections.abc import Mapping
+
 from .modeling_utils import (PretrainedConfig, PretrainedModel,
                              SpeculativeDecodingMode)
-from .mpt.model import MPTForCausalLM, MPTModel
-from .opt.model import OPTForCausalLM, OPTModel
-from .phi3.model import Phi3ForCausalLM, Phi3Model
-from .phi.model import PhiForCausalLM, PhiModel
-from .qwen.model import QWenForCausalLM
-from .recurrentgemma.model import RecurrentGemmaForCausalLM
+
+# The model classes are imported on first use, so importing the package (or a single model) does not import the modules
+# of every model.
+_MODEL_CLASSES = {
+    'BaichuanForCausalLM': '.baichuan.model',
+    'BertForQuestionAnswering': '.bert.model',
+    'BertForSequenceClassification': '.bert.model',
+    'BertModel': '.bert.model',
+    'BloomForCausalLM': '.bloom.model',
+    'BloomModel': '.bloom.model',
+    'ChatGLMForCausalLM': '.chatglm.model',
+    'ChatGLMModel': '.chatglm.model',
+    'CogVLMForCausalLM': '.cogvlm.model',
+    'DbrxForCausalLM': '.dbrx.model',
+    'DecoderModel': '.enc_dec.model',
+    'EncoderModel': '.enc_dec.model',
+    'WhisperEncoder': '.enc_dec.model',
+    'FalconForCausalLM': '.falcon.model',
+    'FalconModel': '.falcon.model',
+    'GemmaForCausalLM': '.gemma.model',
+    'GPTForCausalLM': '.gpt.model',
+    'GPTModel': '.gpt.model',
+    'GPTJForCausalLM': '.gptj.model',
+    'GPTJModel': '.gptj.model',
+    'GPTNeoXForCausalLM': '.gptneox.model',
+    'GPTNeoXModel': '.gptneox.model',
+    'LLaMAForCausalLM': '.llama.model',
+    'LLaMAModel': '.llama.model',
+    'MambaForCausalLM': '.mamba.model',
+    'MedusaForCausalLm': '.medusa.model',
+    'MPTForCausalLM': '.mpt.model',
+    'MPTModel': '.mpt.model',
+    'OPTForCausalLM': '.opt.model',
+    'OPTModel': '.opt.model',
+    'Phi3ForCausalLM': '.phi3.model',
+    'Phi3Model': '.phi3.model',
+    'PhiForCausalLM': '.phi.model',
+    'PhiModel': '.phi.model',
+    'QWenForCausalLM': '.qwen.model',
+    'RecurrentGemmaForCausalLM': '.recurrentgemma.model',
+}
+
+
+def __getattr__(name: str):
+    if name in _MODEL_CLASSES:
+        model_cls = getattr(
+            importlib.import_module(_MODEL_CLASSES[name], __name__), name)
+        globals()[name] = model_cls
+        return model_cls
+    # The submodules used to be imported along with the package
+    try:
+        return importlib.import_module(f'.{name}', __name__)
+    except ModuleNotFoundError as e:
+        if e.name != f'{__name__}.{name}':
+            raise
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_MODEL_CLASSES))
+
 
 __all__ = [
     'BertModel',
@@ -80,31 +122,51 @@ __all__ = [
     'SpeculativeDecodingMode',
 ]
 
-MODEL_MAP = {
-    'GPTForCausalLM': GPTForCausalLM,
-    'OPTForCausalLM': OPTForCausalLM,
-    'BloomForCausalLM': BloomForCausalLM,
-    'FalconForCausalLM': FalconForCausalLM,
-    'PhiForCausalLM': PhiForCausalLM,
-    'Phi3ForCausalLM': Phi3ForCausalLM,
-    'MambaForCausalLM': MambaForCausalLM,
-    'GPTNeoXForCausalLM': GPTNeoXForCausalLM,
-    'GPTJForCausalLM': GPTJForCausalLM,
-    'MPTForCausalLM': MPTForCausalLM,
-    'ChatGLMForCausalLM': ChatGLMForCausalLM,
-    'LlamaForCausalLM': LLaMAForCausalLM,
-    'MistralForCausalLM': LLaMAForCausalLM,
-    'MixtralForCausalLM': LLaMAForCausalLM,
-    'ArcticForCausalLM': LLaMAForCausalLM,
-    'InternLMForCausalLM': LLaMAForCausalLM,
-    'MedusaForCausalLM': MedusaForCausalLm,
-    'BaichuanForCausalLM': BaichuanForCausalLM,
-    'SkyworkForCausalLM': LLaMAForCausalLM,
-    'GemmaForCausalLM': GemmaForCausalLM,
-    'QWenForCausalLM': QWenForCausalLM,
-    'EncoderModel': EncoderModel,
-    'DecoderModel': DecoderModel,
-    'DbrxForCausalLM': DbrxForCausalLM,
-    'RecurrentGemmaForCausalLM': RecurrentGemmaForCausalLM,
-    'CogVLMForCausalLM': CogVLMForCausalLM,
-}
+
+class _LazyModelMap(Mapping):
+    ''' The architecture to model class mapping, a class is imported when it is looked up. '''
+
+    def __init__(self, classes: dict):
+        self._classes = classes
+
+    def __getitem__(self, architecture: str):
+        return __getattr__(self._classes[architecture])
+
+    def __iter__(self):
+        return iter(self._classes)
+
+    def __len__(self):
+        return len(self._classes)
+
+    def __contains__(self, architecture: object) -> bool:
+        return architecture in self._classes
+
+
+MODEL_MAP = _LazyModelMap({
+    'GPTForCausalLM': 'GPTForCausalLM',
+    'OPTForCausalLM': 'OPTForCausalLM',
+    'BloomForCausalLM': 'BloomForCausalLM',
+    'FalconForCausalLM': 'FalconForCausalLM',
+    'PhiForCausalLM': 'PhiForCausalLM',
+    'Phi3ForCausalLM': 'Phi3ForCausalLM',
+    'MambaForCausalLM': 'MambaForCausalLM',
+    'GPTNeoXForCausalLM': 'GPTNeoXForCausalLM',
+    'GPTJForCausalLM': 'GPTJForCausalLM',
+    'MPTForCausalLM': 'MPTForCausalLM',
+    'ChatGLMForCausalLM': 'ChatGLMForCausalLM',
+    'LlamaForCausalLM': 'LLaMAForCausalLM',
+    'MistralForCausalLM': 'LLaMAForCausalLM',
+    'MixtralForCausalLM': 'LLaMAForCausalLM',
+    'ArcticForCausalLM': 'LLaMAForCausalLM',
+    'InternLMForCausalLM': 'LLaMAForCausalLM',
+    'MedusaForCausalLM': 'MedusaForCausalLm',
+    'BaichuanForCausalLM': 'BaichuanForCausalLM',
+    'SkyworkForCausalLM': 'LLaMAForCausalLM',
+    'GemmaForCausalLM': 'GemmaForCausalLM',
+    'QWenForCausalLM': 'QWenForCausalLM',
+    'EncoderModel': 'EncoderModel',
+    'DecoderModel': 'DecoderModel',
+    'DbrxForCausalLM': 'DbrxForCausalLM',
+    'RecurrentGemmaForCausalLM': 'RecurrentGemmaForCausalLM',
+    'CogVLMForCausalLM': 'CogVLMForCausalLM',
+})
@@ -12,6 +12,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import functools
 import unittest
 from itertools import product
 
@@ -26,43 +27,58 @@ from polygraphy.backend.trt import EngineFromNetwork, TrtRunner
 import tensorrt_llm
 from tensorrt_llm import Tensor
 
+KEEP_DIMS = [False, True]
+DIMS = [0, 1, 2]
 
-class TestFunctional(unittest.TestCase):
 
-    def setUp(self):
-        tensorrt_llm.logger.set_level('error')
+@functools.lru_cache(maxsize=None)
+def run_argmax(dtype):
+    ''' Build a single engine with the argmax along every dim, with and without keepdim, and run it once. The
+    parameterized cases of a dtype share it instead of building an engine each. '''
+    # test data
+    x_shape = (4, 12, 32)
+    x_data = torch.rand(x_shape,
+                        dtype=tensorrt_llm._utils.str_dtype_to_torch(dtype))
 
-    @parameterized.expand(
-        list(product(['float32', 'float16'], [False, True], [0, 1, 2])))
-    def test_argmax(self, dtype, keep_dim, dim):
-        # test data
-        x_shape = (4, 12, 32)
-        x_data = torch.rand(x_shape,
-                            dtype=tensorrt_llm._utils.str_dtype_to_torch(dtype))
-
-        # construct trt network
-        builder = tensorrt_llm.Builder()
-        net = builder.create_network()
-        with tensorrt_llm.net_guard(net):
-            network = tensorrt_llm.default_trtnet()
-            x = Tensor(name='x',
-                       shape=x_shape,
-                       dtype=tensorrt_llm.str_dtype_to_trt(dtype))
+    # construct trt network
+    builder = tensorrt_llm.Builder()
+    net = builder.create_network()
+    with tensorrt_llm.net_guard(net):
+        network = tensorrt_llm.default_trtnet()
+        x = Tensor(name='x',
+                   shape=x_shape,
+                   dtype=tensorrt_llm.str_dtype_to_trt(dtype))
 
+        for keep_dim, dim in product(KEEP_DIMS, DIMS):
             output = tensorrt_llm.functional.argmax(x, dim,
                                                     keepdim=keep_dim).trt_tensor
-            output.name = 'output'
+            output.name = f'output_{keep_dim}_{dim}'
             network.mark_output(output)
 
-        # trt run
-        build_engine = EngineFromNetwork((builder.trt_builder, net.trt_network))
-        with TrtRunner(build_engine) as runner:
-            outputs = runner.infer(feed_dict={
-                'x': x_data.numpy(),
-            })
+    # trt run
+    build_engine = EngineFromNetwork((builder.trt_builder, net.trt_network))
+    with TrtRunner(build_engine) as runner:
+        outputs = runner.infer(feed_dict={
+            'x': x_data.numpy(),
+        })
+        # The output buffers belong to the runner
+        outputs = {name: np.copy(output) for name, output in outputs.items()}
+    return x_data, outputs
+
+
+class TestFunctional(unittest.TestCase):
+
+    def setUp(self):
+        tensorrt_llm.logger.set_level('error')
+
+    @parameterized.expand(list(product(['float32', 'float16'], KEEP_DIMS,
+                                       DIMS)))
+    def test_argmax(self, dtype, keep_dim, dim):
+        x_data, outputs = run_argmax(dtype)
 
         # pytorch run
         ref = x_data.argmax(dim=dim, keepdim=keep_dim)
 
         # compare diff
-        np.testing.assert_allclose(ref.cpu().numpy(), outputs['output'])
+        np.testing.assert_allclose(ref.cpu().numpy(),
+                                   outputs[f'output_{keep_dim}_{dim}'])
@@ -12,8 +12,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import functools
 import math
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
@@ -47,33 +49,43 @@ default_hidden_size = {
     'fp8': 16,
 }
 
+# The order of the test_mixture_of_experts arguments
+param_fields = ('num_experts', 'topk', 'hidden_size', 'actfn', 'bias', 'dtype',
+                'weight_dtype', 'norm_mode', 'use_plugin')
+default_params = {
+    'num_experts': 4,
+    'topk': 1,
+    'hidden_size': None,
+    'actfn': default_actfn,
+    'bias': True,
+    'dtype': 'float16',
+    'weight_dtype': None,
+    'norm_mode': MoeConfig.ExpertScaleNormalizationMode.NONE,
+    'use_plugin': True,
+}
+
+
+def make_tuple(**overrides):
+    config = {**default_params, **overrides}
+    if config['weight_dtype'] is None:
+        config['weight_dtype'] = config['dtype']
+    if config['hidden_size'] is None:
+        config['hidden_size'] = default_hidden_size[config['weight_dtype']]
+    return tuple(config[field] for field in param_fields)
 
-def make_tuple(num_experts=4,
-               topk=1,
-               hidden_size=None,
-               actfn=default_actfn,
-               bias=True,
-               dtype='float16',
-               weight_dtype=None,
-               norm_mode=MoeConfig.ExpertScaleNormalizationMode.NONE,
-               use_plugin=True):
-    if weight_dtype is None:
-        weight_dtype = dtype
-    if hidden_size is None:
-        hidden_size = default_hidden_size[weight_dtype]
-    return (num_experts, topk, hidden_size, actfn, bias, dtype, weight_dtype,
-            norm_mode, use_plugin)
+
+# The SM version does not change during the run, query the driver only once
+sm_version = getSMVersion()
+# TODO: Support ootb path with sm_version < 90:
+enable_ootb = sm_version >= 90
+enable_bf16 = sm_version >= 80
+enable_fp8 = sm_version >= 90
 
 
 def config_is_allowed(config):
-    # TODO: Support ootb path with getSMVersion() < 90:
-    enable_ootb = getSMVersion() >= 90
-    enable_bf16 = getSMVersion() >= 80
-    enable_fp8 = getSMVersion() >= 90
-
-    DATA_TYPE_INDEX = 5
-    WEIGHT_TYPE_INDEX = 6
-    USE_PLUGIN_INDEX = 8
+    DATA_TYPE_INDEX = param_fields.index('dtype')
+    WEIGHT_TYPE_INDEX = param_fields.index('weight_dtype')
+    USE_PLUGIN_INDEX = param_fields.index('use_plugin')
     if not enable_fp8 and config[WEIGHT_TYPE_INDEX] == 'fp8':
         return False
     if not enable_bf16 and config[DATA_TYPE_INDEX] == 'bfloat16':
@@ -87,17 +99,25 @@ def gen_uniform_weights(*args, **kwargs):
     return (torch.rand(*args, **kwargs) * 2 - 1).contiguous()
 
 
+def contiguous_numpy(tensor):
+    # torch_to_numpy does not copy a contiguous host tensor, so this copies at most once
+    return torch_to_numpy(tensor.contiguous())
+
+
 def quant_dequant_int(weights, quant_mode):
     # use the test version `_symmetric_...` to get the non-interleaved weights
-    type = torch.quint4x2 if quant_mode.is_int4_weight_only() else torch.int8
+    use_int4_weights = quant_mode.is_int4_weight_only()
+    type = torch.quint4x2 if use_int4_weights else torch.int8
+    weights_t = weights.T.cpu().contiguous()
     quant_weights, _, torch_weight_scales = torch.ops.trtllm._symmetric_quantize_last_axis_of_batched_matrix(
-        weights.T.cpu().contiguous(), type)
+        weights_t, type)
 
-    # Unpack the int4s int int8s
-    if quant_mode.is_int4_weight_only():
-        upper = (quant_weights >> 4)
-        lower = (quant_weights << 4) >> 4  # Arithmetic right shift sign extends
-        quant_weights = torch.stack((lower, upper), dim=2).view(weights.T.shape)
+    # Unpack the int4s int int8s: duplicate each packed byte, move the low nibbles up and sign extend both
+    #  halves with an arithmetic right shift, all in place in the one output allocation
+    if use_int4_weights:
+        quant_weights = quant_weights.repeat_interleave(2, dim=1)
+        quant_weights[:, 0::2] <<= 4
+        quant_weights >>= 4
 
     quant_weights = quant_weights.to(dtype=weights.dtype)
     result = torch.multiply(quant_weights,
@@ -117,32 +137,31 @@ GATED_TO_ACT = {
     'geglu': 'gelu',
 }
 
+# The TensorRT-LLM gelu (and the MoE plugin) uses the tanh approximation
+ACT_FNS = {
+    'gelu': functools.partial(torch.nn.functional.gelu, approximate='tanh'),
+    'relu': torch.nn.functional.relu,
+    'silu': torch.nn.functional.silu,
+    'identity': lambda input: input,
+}
+
 
 def is_gated_activation(actfn):
     return actfn in GATED_TO_ACT
 
 
 def gated2act(actfn):
-    if is_gated_activation(actfn):
-        return GATED_TO_ACT[actfn]
-    return actfn
+    return GATED_TO_ACT.get(actfn, actfn)
 
 
 def doact(input, actfn):
     assert not is_gated_activation(actfn)
-    if actfn == 'gelu':
-        return torch.nn.functional.gelu(input)
-    if actfn == 'relu':
-        return torch.nn.functional.relu(input)
-    if actfn == 'silu':
-        return torch.nn.functional.silu(input)
-    assert actfn == "identity"
-    return input  # Identity
+    return ACT_FNS[actfn](input)
 
 
 def gated_matmul(input, weights, bias, actfn):
     assert is_gated_activation(actfn)
-    fc1 = torch.matmul(input, weights.T) + bias
+    fc1 = torch.addmm(bias, input, weights.T)
     fc1, gate = fc1.chunk(2, dim=-1)
     return fc1 * doact(gate, gated2act(actfn))
 
@@ -153,16 +172,21 @@ class TestFunctional(unittest.TestCase):
         # There is a known precision issues where the topk may select different experts when the routing probabilities are similar.
         #  This causes a completely different output for the affected tokens. So we set the seed to prevent sporadic failures
         #  This shouldn't be a problem for most practical applications as it means the experts are equally good choices
-        torch.manual_seed(0x766E)
+        # The weights are drawn on the device and the inputs on the host, seeding a generator for each keeps the same
+        #  values as seeding the global RNGs without touching their state
+        self.generator = torch.Generator(device='cuda').manual_seed(0x766E)
+        self.cpu_generator = torch.Generator().manual_seed(0x766E)
         tensorrt_llm.logger.set_level('error')
 
-    def eye(self, shape, dtype, device='cuda'):
-        """ Utility function for creating expert weights as an identity matrix for easy debugging """
+    def eye(self, shape, dtype, device='cuda', contiguous=True):
+        """ Utility function for creating expert weights as an identity matrix for easy debugging
+        Pass contiguous=False for a read-only broadcast view instead of a copy per expert """
         eye = torch.eye(shape[-2], m=shape[-1], dtype=dtype, device=device)
-        eye = eye.repeat(*shape[:-2], 1, 1)
-        return eye
+        eye = eye.expand(*shape)
+        return eye.contiguous() if contiguous else eye
 
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def get_params():
         params = []
         params += [
@@ -202,13 +226,11 @@ class TestFunctional(unittest.TestCase):
         ]
 
         # Add some cases for quantized dtype
-        for dtype in ('int8', 'int4'):
-            params += [
-                make_tuple(dtype='float16', hidden_size=64, weight_dtype=dtype),
-            ]
-            params += [
-                make_tuple(dtype='bfloat16', hidden_size=64, weight_dtype=dtype)
-            ]
+        params += [
+            make_tuple(dtype=dtype, hidden_size=64, weight_dtype=weight_dtype)
+            for weight_dtype in ('int8', 'int4')
+            for dtype in ('float16', 'bfloat16')
+        ]
 
         # fp8 tests
         params += [
@@ -219,28 +241,26 @@ class TestFunctional(unittest.TestCase):
         ]
 
         # Test all activation functions with float16
-        for actfn in ('relu', 'silu', 'gelu', 'swiglu', 'geglu', 'identity'):
-            if actfn == default_actfn:
-                continue  # Dont need to retest the activation function every other case uses
-
-            params += [
-                make_tuple(actfn=actfn, dtype='float16'),
-                make_tuple(actfn=actfn, dtype='float16', use_plugin=False)
-            ]
+        # Dont need to retest the activation function every other case uses
+        params += [
+            make_tuple(actfn=actfn, dtype='float16', use_plugin=use_plugin)
+            for actfn in ('relu', 'silu', 'gelu', 'swiglu', 'geglu', 'identity')
+            if actfn != default_actfn for use_plugin in (True, False)
+        ]
 
         # Test gated with all data types as it has a different path
         for actfn in ('swiglu', 'geglu'):
-            if actfn == default_actfn:
-                continue  # Dont need to retest the one every other case uses
             params += [
                 make_tuple(actfn=actfn, dtype='float32'),
                 make_tuple(actfn=actfn, dtype='float16', weight_dtype='int8'),
                 make_tuple(actfn=actfn, dtype='bfloat16'),
-                make_tuple(actfn='geglu',
-                           dtype='float16',
-                           weight_dtype='fp8',
-                           bias=False)
             ]
+        params += [
+            make_tuple(actfn='geglu',
+                       dtype='float16',
+                       weight_dtype='fp8',
+                       bias=False)
+        ]
 
         # Test different k values for gated activations (regression case)
         params += [
@@ -312,48 +332,57 @@ class TestFunctional(unittest.TestCase):
                 actfn='swiglu')
         ]
 
-        filtered_params = []
-        for p in params:
-            if config_is_allowed(p):
-                filtered_params.append(p)
-
-        return filtered_params
+        return [p for p in params if config_is_allowed(p)]
 
     def create_weights(self, num_experts, hidden_size, ffn_hidden_size, bias,
                        dtype, weight_dtype, is_gated):
+        torch_dtype = trt_dtype_to_torch(dtype)
         self.router_weights = torch.randn((num_experts, hidden_size),
                                           dtype=torch.float32,
-                                          device="cuda")
+                                          device="cuda",
+                                          generator=self.generator)
         # Use a uniform scale for int8 so the quantization has a well-behaved dynamic range
-        genfn = gen_uniform_weights if weight_dtype == trt.int8 else torch.randn
+        use_uniform = weight_dtype == trt.int8
+        genfn = functools.partial(
+            gen_uniform_weights if use_uniform else torch.randn,
+            generator=self.generator)
 
         # Rescale the weights if we are using gated so the results are in a similar range
         # This is 'about right' to keep the variance the same based on some napkin maths
         fc1_weight_rescale = 1 / math.sqrt(2) if is_gated else 1
         fc2_weight_rescale = 1
-        if genfn == torch.randn:
+        if not use_uniform:
             fc1_weight_rescale *= math.sqrt(2.0 / ffn_hidden_size)
             fc2_weight_rescale *= math.sqrt(2.0 / hidden_size)
 
         fc1_out_size = ffn_hidden_size * 2 if is_gated else ffn_hidden_size
         self.fc1_weights = genfn((num_experts, fc1_out_size, hidden_size),
-                                 dtype=trt_dtype_to_torch(dtype),
+                                 dtype=torch_dtype,
                                  device="cuda") * fc1_weight_rescale
 
         self.fc2_weights = genfn((num_experts, hidden_size, ffn_hidden_size),
-                                 dtype=trt_dtype_to_torch(dtype),
+                                 dtype=torch_dtype,
                                  device="cuda") * fc2_weight_rescale
 
         bias_tensor_func = genfn if bias else torch.zeros
         self.fc1_bias = bias_tensor_func((num_experts, fc1_out_size),
-                                         dtype=trt_dtype_to_torch(dtype),
+                                         dtype=torch_dtype,
                                          device="cuda")
 
         self.fc2_bias = bias_tensor_func((num_experts, hidden_size),
-                                         dtype=trt_dtype_to_torch(dtype),
+                                         dtype=torch_dtype,
                                          device="cuda")
 
+        # Stage the host copies once, building the networks reads them instead of copying from the device again
+        self.router_weights_cpu = self.router_weights.cpu()
+        self.fc1_weights_cpu = self.fc1_weights.cpu()
+        self.fc2_weights_cpu = self.fc2_weights.cpu()
+        self.fc1_bias_cpu = self.fc1_bias.cpu()
+        self.fc2_bias_cpu = self.fc2_bias.cpu()
+
         # Set later
+        self.fc1_weights_fp8 = None
+        self.fc2_weights_fp8 = None
         self.weight_scaling_factor_1 = None
         self.weight_scaling_factor_2 = None
         self.activation_scaling_factor_1 = None
@@ -365,13 +394,19 @@ class TestFunctional(unittest.TestCase):
         self.activation_scaling_factor_2 = torch.tensor([max_act2
                                                          ]).float() / 440.
 
-        def max_weights(weights):
-            return torch.max(torch.abs(weights.view(weights.shape[0], -1)),
-                             dim=1,
-                             keepdim=True)[0].float()
+        def quantize(weights):
+            # Scale and cast on the device, only the fp8 weights and their scaling factors are copied to the host
+            amax = weights.view(weights.shape[0], -1).abs().amax(dim=1,
+                                                                 keepdim=True)
+            scaling_factor = amax.float() / 440.
+            fp8_weights = (weights / scaling_factor.unsqueeze(-1)).to(
+                torch.float8_e4m3fn)
+            return fp8_weights.cpu(), scaling_factor.cpu()
 
-        self.weight_scaling_factor_1 = max_weights(self.fc1_weights) / 440.
-        self.weight_scaling_factor_2 = max_weights(self.fc2_weights) / 440.
+        self.fc1_weights_fp8, self.weight_scaling_factor_1 = quantize(
+            self.fc1_weights)
+        self.fc2_weights_fp8, self.weight_scaling_factor_2 = quantize(
+            self.fc2_weights)
 
     @parameterized.expand(get_params(), name_func=unittest_name_func)
     def test_mixture_of_experts(self, num_experts, top_k, hidden_size, actfn,
@@ -408,35 +443,52 @@ class TestFunctional(unittest.TestCase):
                             is_gated=is_gated_activation(actfn))
 
         sequence_sizes = [(1, 1), (max_num_seq, max_seq_len)]
-        inputs = [gen_uniform_weights((num_seq, seq_len, hidden_size), dtype=trt_dtype_to_torch(dtype)) \
+        torch_dtype = trt_dtype_to_torch(dtype)
+        inputs = [gen_uniform_weights((num_seq, seq_len, hidden_size), dtype=torch_dtype, generator=self.cpu_generator) \
                   for num_seq, seq_len in sequence_sizes]
-        reference_values = []
-
-        act_1_quant = max(*[torch.max(torch.abs(v)).item() for v in inputs])
-        act_2_quant = 0.0
-
-        for i, input in enumerate(inputs):
-            result, act2_quant_values = self.referenceImpl(
-                input, top_k, actfn, weight_dtype, quant_mode, norm_mode)
-            reference_values.append(result.cpu().float())
-            act_2_quant = max(act_2_quant, act2_quant_values)
-
-        self.create_fp8_scaling_factors(act_1_quant, act_2_quant)
-
-        engine = self.buildTrtEngine(
-            (-1, -1, hidden_size),
-            num_experts,
-            top_k,
-            hidden_size,
-            ffn_hidden_size,
-            actfn,
-            bias,
-            dtype,
-            weight_dtype=weight_dtype,
-            quant_mode=quant_mode,
-            norm_mode=norm_mode,
-            use_plugin=use_plugin,
-            max_sizes=[max_num_seq, max_seq_len, hidden_size])
+
+        def run_reference():
+            # The tokens are independent, run the reference once over the tokens of both inputs
+            tokens = [input.view(-1, hidden_size) for input in inputs]
+            result, act_2_quant = self.referenceImpl(torch.cat(tokens), top_k,
+                                                     actfn, weight_dtype,
+                                                     quant_mode, norm_mode)
+            results = result.cpu().float().split([len(t) for t in tokens])
+            reference_values = [
+                r.view(input.shape) for r, input in zip(results, inputs)
+            ]
+            return reference_values, act_2_quant
+
+        def build_engine():
+            # The polygraphy loader is lazy, call it so the engine is built here and only once for both inputs
+            return self.buildTrtEngine(
+                (-1, -1, hidden_size),
+                num_experts,
+                top_k,
+                hidden_size,
+                ffn_hidden_size,
+                actfn,
+                bias,
+                dtype,
+                weight_dtype=weight_dtype,
+                quant_mode=quant_mode,
+                norm_mode=norm_mode,
+                use_plugin=use_plugin,
+                max_sizes=[max_num_seq, max_seq_len, hidden_size])()
+
+        # Only the fp8 engine depends on the reference (through the activation scaling factors),
+        #  otherwise build the engine while the reference runs in the background
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            reference = pool.submit(run_reference)
+            if not use_fp8_qdq:
+                engine = build_engine()
+            reference_values, act_2_quant = reference.result()
+
+        if use_fp8_qdq:
+            act_1_quant = torch.stack([v.abs().amax()
+                                       for v in inputs]).amax().item()
+            self.create_fp8_scaling_factors(act_1_quant, act_2_quant)
+            engine = build_engine()
 
         for input, ref in zip(inputs, reference_values):
             # construct trt network
@@ -477,8 +529,8 @@ class TestFunctional(unittest.TestCase):
                        ('bfloat16', actfn, True), ('int8', actfn, True),
                        ('int4', actfn, True)]
             # OOTB tests
-            # TODO: Support ootb path with getSMVersion() < 90, quantization:
-            if getSMVersion() >= 90:
+            # TODO: Support ootb path with sm_version < 90, quantization:
+            if enable_ootb:
                 params += [('float32', actfn, False), ('float16', actfn, False),
                            ('bfloat16', actfn, False)]
         return params
@@ -517,7 +569,8 @@ class TestFunctional(unittest.TestCase):
 
         input_data = gen_uniform_weights(
             (num_sequences, sequence_lengths, hidden_size),
-            dtype=trt_dtype_to_torch(dtype))
+            dtype=trt_dtype_to_torch(dtype),
+            generator=self.cpu_generator)
 
         def MLP(network, trt_key):
             mlp_type = tensorrt_llm.layers.GatedMLP if is_gated_activation(
@@ -529,29 +582,25 @@ class TestFunctional(unittest.TestCase):
                            quant_mode=quant_mode,
                            dtype=dtype)
             # Quantize the weights manually so the results are comparable
-            fc1_qd = quant_dequant(self.fc1_weights[0].cpu(), quant_mode)
+            fc1_qd = quant_dequant(self.fc1_weights_cpu[0], quant_mode)
             if is_gated_activation(actfn):
                 # Note that the MLP uses the opposite convention to the GLU paper for naming,
                 #  the gate is the matrix the activations are NOT applied to
                 gate, fc1_qd = fc1_qd.chunk(2, dim=0)
-                mlp.gate.weight.value = np.ascontiguousarray(
-                    torch_to_numpy(gate))
+                mlp.gate.weight.value = contiguous_numpy(gate)
 
-            mlp.fc.weight.value = np.ascontiguousarray(torch_to_numpy(fc1_qd))
-            fc2_qd = quant_dequant(self.fc2_weights[0].cpu(), quant_mode)
-            mlp.proj.weight.value = np.ascontiguousarray(torch_to_numpy(fc2_qd))
+            mlp.fc.weight.value = contiguous_numpy(fc1_qd)
+            fc2_qd = quant_dequant(self.fc2_weights_cpu[0], quant_mode)
+            mlp.proj.weight.value = contiguous_numpy(fc2_qd)
             if bias:
-                fc1_bias = self.fc1_bias[0].cpu()
+                fc1_bias = self.fc1_bias_cpu[0]
 
                 if is_gated_activation(actfn):
                     gate, fc1_bias = fc1_bias.chunk(2, dim=0)
-                    mlp.gate.bias.value = np.ascontiguousarray(
-                        torch_to_numpy(gate))
+                    mlp.gate.bias.value = contiguous_numpy(gate)
 
-                mlp.fc.bias.value = np.ascontiguousarray(
-                    torch_to_numpy(fc1_bias))
-                mlp.proj.bias.value = np.ascontiguousarray(
-                    torch_to_numpy(self.fc2_bias[0].cpu()))
+                mlp.fc.bias.value = contiguous_numpy(fc1_bias)
+                mlp.proj.bias.value = contiguous_numpy(self.fc2_bias_cpu[0])
 
             output = mlp(trt_key).trt_tensor
             output.name = 'mlp_output'
@@ -574,7 +623,7 @@ class TestFunctional(unittest.TestCase):
         tolerances = {
             'float32': 1e-2,
             'float16': 2e-2
-            if getSMVersion() >= 75 else 1e-1,  # Some issues for geglu on volta
+            if sm_version >= 75 else 1e-1,  # Some issues for geglu on volta
             'bfloat16': 1e-1,
             'int8': 2e-1,
             'int4': 2e-1,
@@ -589,29 +638,26 @@ class TestFunctional(unittest.TestCase):
                          moe_weight_wrapper,
                          quant_mode,
                          fp8_scalar=None):
-        if quant_mode.is_weight_only():
-            torch_transpose = torch.transpose(input_weights, 1,
-                                              2).contiguous().cpu()
-            type = torch.quint4x2 if quant_mode.is_int4_weight_only(
-            ) else torch.int8
+        use_weight_only = quant_mode.is_weight_only()
+        use_int4_weights = quant_mode.is_int4_weight_only()
+        use_fp8_qdq = quant_mode.has_fp8_qdq()
+        if use_weight_only:
+            torch_transpose = torch.transpose(input_weights, 1, 2).contiguous()
+            type = torch.quint4x2 if use_int4_weights else torch.int8
             processed_torch_weights, torch_weight_scales = torch.ops.trtllm.symmetric_quantize_last_axis_of_batched_matrix(
                 torch_transpose, type)
             # Change the shape to what moe expects without touching the underlying format
-            moe_weight_wrapper.weight.value = np.ascontiguousarray(
-                torch_to_numpy(processed_torch_weights))
-            moe_weight_wrapper.per_channel_scale.value = np.ascontiguousarray(
-                torch_to_numpy(torch_weight_scales))
-        elif quant_mode.has_fp8_qdq():
-            processed_torch_weights = (input_weights /
-                                       fp8_scalar.unsqueeze(-1)).to(
-                                           torch.float8_e4m3fn)
-            moe_weight_wrapper.weight.value = np.ascontiguousarray(
-                torch_to_numpy(processed_torch_weights))
-            moe_weight_wrapper.weights_scaling_factor.value = np.ascontiguousarray(
-                torch_to_numpy(fp8_scalar))
+            moe_weight_wrapper.weight.value = contiguous_numpy(
+                processed_torch_weights)
+            moe_weight_wrapper.per_channel_scale.value = contiguous_numpy(
+                torch_weight_scales)
+        elif use_fp8_qdq:
+            # The weights are already scaled and cast by create_fp8_scaling_factors
+            moe_weight_wrapper.weight.value = contiguous_numpy(input_weights)
+            moe_weight_wrapper.weights_scaling_factor.value = contiguous_numpy(
+                fp8_scalar)
         else:
-            moe_weight_wrapper.weight.value = np.ascontiguousarray(
-                torch_to_numpy(input_weights))
+            moe_weight_wrapper.weight.value = contiguous_numpy(input_weights)
 
     def buildTrtEngine(self,
                        input_shape,
@@ -648,14 +694,17 @@ class TestFunctional(unittest.TestCase):
                                           bias=bias,
                                           dtype=dtype,
                                           quant_mode=quant_mode)
-            moe.router.weight.value = torch_to_numpy(self.router_weights.cpu())
+            moe.router.weight.value = torch_to_numpy(self.router_weights_cpu)
 
-            self.set_weight_layer(self.fc1_weights, moe.fc, quant_mode,
-                                  self.weight_scaling_factor_1)
-            self.set_weight_layer(self.fc2_weights, moe.proj, quant_mode,
-                                  self.weight_scaling_factor_2)
+            use_fp8_qdq = quant_mode.has_fp8_qdq()
+            self.set_weight_layer(
+                self.fc1_weights_fp8 if use_fp8_qdq else self.fc1_weights_cpu,
+                moe.fc, quant_mode, self.weight_scaling_factor_1)
+            self.set_weight_layer(
+                self.fc2_weights_fp8 if use_fp8_qdq else self.fc2_weights_cpu,
+                moe.proj, quant_mode, self.weight_scaling_factor_2)
 
-            if quant_mode.has_fp8_qdq():
+            if use_fp8_qdq:
                 moe.fc.activation_scaling_factor.value = torch_to_numpy(
                     self.activation_scaling_factor_1)
                 moe.proj.activation_scaling_factor.value = torch_to_numpy(
@@ -666,8 +715,8 @@ class TestFunctional(unittest.TestCase):
                     self.weight_scaling_factor_2)
 
             if bias:
-                moe.fc.bias.value = torch_to_numpy(self.fc1_bias.cpu())
-                moe.proj.bias.value = torch_to_numpy(self.fc2_bias.cpu())
+                moe.fc.bias.value = torch_to_numpy(self.fc1_bias_cpu)
+                moe.proj.bias.value = torch_to_numpy(self.fc2_bias_cpu)
 
             if custom_network:
                 custom_network(network, trt_key)
@@ -736,39 +785,53 @@ class TestFunctional(unittest.TestCase):
         # Always run the ref implementation at full precision TODO is this a good choice?
         inputs = inputs.cuda().float()
         inputs_merged = inputs.view(-1, inputs.shape[-1])
-        routing = torch.matmul(inputs_merged, self.router_weights.T.float())
+        # The router weights are created in float32, no cast or transposed copy is needed
+        routing = torch.nn.functional.linear(inputs_merged, self.router_weights)
         assert routing.shape == (inputs_merged.shape[0],
                                  self.router_weights.shape[0])
-        router_probs = torch.softmax(routing, 1, dtype=inputs.dtype)
-        assert routing.shape == router_probs.shape
 
-        topk = torch.topk(router_probs, k)
-        assert topk.indices.shape == (router_probs.shape[0], k)
-        max_act_2 = 0.0
+        # The softmax is monotonic, so the experts can be selected on the logits directly
+        topk_values, topk_indices = torch.topk(routing, k)
+        assert topk_indices.shape == (routing.shape[0], k)
+        if norm_mode == MoeConfig.ExpertScaleNormalizationMode.RENORMALIZE:
+            # Renormalizing the selected probabilities is the softmax of the selected logits
+            router_scales = torch.softmax(topk_values, 1)
+        else:
+            # The softmax evaluated at the selected logits only, the full probabilities are never materialized
+            router_scales = torch.exp(topk_values -
+                                      routing.logsumexp(1, keepdim=True))
+
+        # Reduce on the device and read the value back once at the end
+        max_act_2 = torch.zeros((), device=inputs.device)
         results = torch.zeros_like(inputs_merged)
-        for i, (scales, experts) in enumerate(zip(topk.values, topk.indices)):
-            if norm_mode == MoeConfig.ExpertScaleNormalizationMode.RENORMALIZE:
-                scales /= sum(scales)
-            input = inputs_merged[i, :]
-            for scale, expert in zip(scales, experts):
-                fc1_qd = quant_dequant(self.fc1_weights[expert], quant_mode)
-                if is_gated_activation(actfn):
-                    fc1 = gated_matmul(input, fc1_qd.float(),
-                                       self.fc1_bias[expert].float(), actfn)
-                else:
-                    fc1 = torch.matmul(
-                        input,
-                        fc1_qd.T.float()) + self.fc1_bias[expert].float()
-                    fc1 = doact(fc1, actfn)
-
-                max_act_2 = max(max_act_2, torch.max(torch.abs(fc1)).item())
-
-                fc2_qd = quant_dequant(self.fc2_weights[expert], quant_mode)
-                final = torch.matmul(
-                    fc1, fc2_qd.T.float()) + self.fc2_bias[expert].float()
-                assert final.shape == (inputs.shape[-1], )
-                results[i] += scale * final
-        return results.view(*inputs.shape), max_act_2
+        fc1_bias = self.fc1_bias.float()
+        fc2_bias = self.fc2_bias.float()
+        # Group the selected (token, slot) pairs by expert, so each expert is quantized once and runs on all of its
+        #  tokens in a single GEMM. Sorting them once makes the groups plain slices, so the group sizes are the only
+        #  values read back before the loop, instead of a nonzero sync per expert
+        selected = topk_indices.flatten()
+        scales = router_scales.flatten()
+        experts, counts = selected.unique(return_counts=True)
+        groups = selected.argsort().split(counts.tolist())
+        for expert, group in zip(experts.tolist(), groups):
+            tokens = group // k
+            input = inputs_merged[tokens]
+            fc1_qd = quant_dequant(self.fc1_weights[expert], quant_mode)
+            if is_gated_activation(actfn):
+                fc1 = gated_matmul(input, fc1_qd.float(), fc1_bias[expert],
+                                   actfn)
+            else:
+                # The bias is added by the GEMM itself instead of a separate elementwise pass over its output
+                fc1 = torch.addmm(fc1_bias[expert], input, fc1_qd.T.float())
+                fc1 = doact(fc1, actfn)
+
+            max_act_2 = torch.maximum(max_act_2, fc1.abs().amax())
+
+            fc2_qd = quant_dequant(self.fc2_weights[expert], quant_mode)
+            final = torch.addmm(fc2_bias[expert], fc1, fc2_qd.T.float())
+            assert final.shape == (len(tokens), inputs.shape[-1])
+            results.index_add_(0, tokens, scales[group].unsqueeze(1) * final)
+        return results.view(*inputs.shape), max_act_2.item()
 
 
 if __name__ == "__main__":
@@ -12,6 +12,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import functools
 import unittest
 from itertools import product
 
@@ -25,7 +26,7 @@ import sys
 
 from cuda import cudart
 from parameterized import parameterized
-from polygraphy.backend.trt import CreateConfig, EngineFromNetwork
+from polygraphy.backend.trt import CreateConfig, EngineFromNetwork, Profile
 
 import tensorrt_llm as tllm
 from tensorrt_llm import Mapping, Tensor
@@ -37,23 +38,75 @@ from tensorrt_llm.plugin.plugin import current_all_reduce_helper
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from utils.util import unittest_name_func
 
+SIZES = [64 * 70000, 64 * 70, 64]
+INNER_LOOP = 5
 
+
+# Skip the class as a whole, so a single GPU run does not set up the reference tensors and the devices
+@unittest.skipIf(tllm.mpi_world_size() == 1, "Skip single GPU NCCL")
 class TestCommunicationPlugin(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        cls.world_size = tllm.mpi_world_size()
+        cls.rank = tllm.mpi_rank()
+
+        torch.cuda.set_device(cls.rank)
+        cudart.cudaSetDevice(cls.rank)
+
+        # The reference tensors only depend on the world size, fill them once for all the cases
+        cls.reference_tensors = [
+            torch.full([10000000], i + 1, dtype=torch.float32, device="cuda")
+            for i in range(cls.world_size)
+        ]
+        cls.mapping = Mapping(cls.world_size, cls.rank, cls.world_size,
+                              cls.world_size)
+
     def setUp(self):
         tllm.logger.set_level('error')
-        self.world_size = tllm.mpi_world_size()
-        self.rank = tllm.mpi_rank()
-
         torch.cuda.set_device(self.rank)
         cudart.cudaSetDevice(self.rank)
 
-        self.reference_tensors = [
-            torch.full([10000000], i + 1, dtype=torch.float32, device="cuda")
-            for i in range(self.world_size)
-        ]
-        self.mapping = Mapping(self.world_size, self.rank, self.world_size,
-                               self.world_size)
+    @classmethod
+    @functools.lru_cache(maxsize=1)
+    def build_session(cls, dtype: str, strategy: AllReduceStrategy,
+                      config: AllReduceConfig) -> tllm.runtime.Session:
+        ''' Build INNER_LOOP chained all-reduces for any input size up to max(SIZES).
+        The sizes are the innermost parameter, so the cases sharing an engine run back to back. '''
+        builder = tllm.Builder()
+        net = builder.create_network()
+        net.plugin_config.set_nccl_plugin(dtype, use_custom_all_reduce=True)
+
+        with tllm.net_guard(net):
+            network = tllm.default_trtnet()
+
+            x = Tensor(name='x',
+                       shape=(-1, ),
+                       dtype=tllm.str_dtype_to_trt(dtype))
+            current_all_reduce_helper().set_workspace_tensor(cls.mapping)
+
+            current = x
+            for i in range(INNER_LOOP):
+                current = allreduce(current, cls.mapping.tp_group, strategy,
+                                    config)
+            output = current.trt_tensor
+
+            output.name = 'output'
+            output.dtype = tllm.str_dtype_to_trt(dtype)
+            network.mark_output(output)
+
+        build_engine = EngineFromNetwork(
+            (builder.trt_builder, net.trt_network),
+            config=CreateConfig(
+                fp16=(dtype == 'float16'),
+                bf16=(dtype == 'bfloat16'),
+                precision_constraints='obey',
+                profiles=[
+                    Profile().add('x', (min(SIZES), ), (max(SIZES), ),
+                                  (max(SIZES), ))
+                ],
+            ))
+        return tllm.runtime.Session.from_engine(build_engine())
 
     @parameterized.expand(list(
         product(["bfloat16", 'float16', "float32"], [
@@ -63,79 +116,43 @@ class TestCommunicationPlugin(unittest.TestCase):
             AllReduceConfig(0),
             AllReduceConfig.PUSH_MODE,
             AllReduceConfig.USE_MEMCPY,
-        ], [64 * 70000, 64 * 70, 64])),
+        ], SIZES)),
                           name_func=unittest_name_func)
     def test_allreduce(self, dtype: str, strategy: AllReduceStrategy,
                        config: AllReduceConfig, size: int):
-        if self.world_size == 1:
-            pytest.skip("Skip single GPU NCCL")
-
         if strategy == AllReduceStrategy.NCCL and config != AllReduceConfig(0):
             pytest.skip("NCCL with specific config discarded")
 
-        workspace = None
-
         torch_dtype = tllm._utils.str_dtype_to_torch(dtype)
-        dtype_size = torch.finfo(torch_dtype).bits // 8
+        dtype_size = torch_dtype.itemsize
 
-        allreduce_ref = torch.zeros(self.reference_tensors[0][:size].shape,
-                                    dtype=torch_dtype,
-                                    device="cuda")
-        for i in range(self.world_size):
-            allreduce_ref = allreduce_ref + self.reference_tensors[i][:size].to(
-                torch_dtype)
+        allreduce_ref = torch.stack([t[:size] for t in self.reference_tensors
+                                     ]).to(torch_dtype).sum(0)
 
-        builder = tllm.Builder()
-        net = builder.create_network()
-        net.plugin_config.set_nccl_plugin(dtype, use_custom_all_reduce=True)
-        _, workspace = current_all_reduce_helper().allocate_workspace(
+        # Keep the IPC buffers referenced until the engine ran, the workspace tensor only holds their addresses
+        buffers, workspace = current_all_reduce_helper().allocate_workspace(
             self.mapping, size * dtype_size)
 
         input = self.reference_tensors[self.rank][:size].to(torch_dtype)
-        inner_loop = 5
 
         with peer_access(self.mapping):
-            with tllm.net_guard(net):
-                network = tllm.default_trtnet()
-
-                x = Tensor(name='x',
-                           shape=input.shape,
-                           dtype=tllm.str_dtype_to_trt(dtype))
-                current_all_reduce_helper().set_workspace_tensor(self.mapping)
-
-                current = x
-                for i in range(inner_loop):
-                    current = allreduce(current, self.mapping.tp_group,
-                                        strategy, config)
-                output = current.trt_tensor
-
-                output.name = 'output'
-                output.dtype = tllm.str_dtype_to_trt(dtype)
-                network.mark_output(output)
-
-            build_engine = EngineFromNetwork(
-                (builder.trt_builder, net.trt_network),
-                config=CreateConfig(
-                    fp16=(dtype == 'float16'),
-                    bf16=(dtype == 'bfloat16'),
-                    precision_constraints='obey',
-                ))
+            session = self.build_session(dtype, strategy, config)
 
             output = torch.zeros_like(input)
 
             stream = torch.cuda.current_stream()
             feed_dict = {'x': input, 'all_reduce_workspace': workspace}
 
-            session = tllm.runtime.Session.from_engine(build_engine())
+            session.set_shapes(feed_dict)
             session.run(inputs=feed_dict,
                         outputs={"output": output},
                         stream=stream.cuda_stream)
             torch.cuda.synchronize()
 
+        # Both tensors are on the device, compare them there
         self.assertTrue(
-            torch.allclose(output.cpu(),
-                           (self.mapping.tp_size**(inner_loop - 1)) *
-                           allreduce_ref.cpu()))
+            torch.allclose(output, (self.mapping.tp_size**(INNER_LOOP - 1)) *
+                           allreduce_ref))
 
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 #!/usr/bin/env python
+import copy
 import operator
+import shutil
 import time
 from functools import reduce
 from pathlib import Path
@@ -19,6 +21,10 @@ class GridSearcher:
         model_config: ModelConfig
         llm_kwargs: Dict[str, Any]
 
+    # The options only read by the runtime, the cases differ only in them share one engine. They iterate innermost in
+    # the tunable space, so these cases run back to back.
+    runtime_options = ("capacity_scheduling_policy", )
+
     def __init__(self, prune_space_for_debug: int = 1e8):
         self.prune_space_for_debug = prune_space_for_debug
         self.latest_latency_per_case: Optional[float] = None
@@ -45,6 +51,8 @@ class GridSearcher:
             print_colored(f"  - {key}: {value}\n", color="green")
         print_colored("\n")
 
+        # The engine of the previous case, removed once the cases sharing it are done
+        built_engine_dir: Optional[Path] = None
         for no, llm_kwargs in enumerate(space):
             if no >= self.prune_space_for_debug:
                 break
@@ -68,6 +76,18 @@ class GridSearcher:
                 "capacity_scheduling_policy"] = capacity_scheduling_policy_str(
                     origin_llm_kwargs["capacity_scheduling_policy"])
 
+            # Each engine is built once and loaded by the following cases with the same build options
+            engine_dir = report_dir / "_".join(["engine"] + [
+                f"{key}-{value}" for key, value in origin_llm_kwargs.items()
+                if key not in self.runtime_options
+            ])
+            if engine_dir != built_engine_dir:
+                if built_engine_dir is not None:
+                    shutil.rmtree(built_engine_dir, ignore_errors=True)
+                # Never load an engine left over by an interrupted search, it might come from another model
+                shutil.rmtree(engine_dir, ignore_errors=True)
+                built_engine_dir = engine_dir
+
             kvcache = KvCacheConfig()
             kvcache.enable_block_reuse = llm_kwargs.pop('kvcache_reuse_blocks')
 
@@ -80,11 +100,13 @@ class GridSearcher:
                 )
 
             _start_time = time.time()
+            # The evaluator points the config to the cached engine, keep the original one for the other cases
             with LLMPerfEvaluator.create(
-                    model_config,
+                    copy.deepcopy(model_config),
                     samples_path,
                     num_samples=num_samples,
                     warmup=max(num_samples // 10, 10),
+                    engine_cache_path=engine_dir,
                     kv_cache_config=kvcache,
                     memory_monitor_interval=memory_monitor_interval,
                     **llm_kwargs) as perf_evaluator:
@@ -98,19 +120,23 @@ class GridSearcher:
             self.latest_latency_per_case = (time.time() -
                                             _start_time) / 60  # min
 
+        if built_engine_dir is not None:
+            shutil.rmtree(built_engine_dir, ignore_errors=True)
+
     @property
     def tunable_space(self):
         tunable_options = dict(
             multi_block_mode=[False, True],
             kvcache_reuse_blocks=[False, True],
-            capacity_scheduling_policy=[
-                CapacitySchedulerPolicy.GUARANTEED_NO_EVICT,
-                CapacitySchedulerPolicy.MAX_UTILIZATION
-            ],
             enable_chunked_context=[False, True],
         )
         if self.model_config.parallel_config.is_multi_gpu:
             tunable_options["use_custom_all_reduce"] = [False, True]
+        # The runtime options go last, so the cases sharing an engine are consecutive
+        tunable_options["capacity_scheduling_policy"] = [
+            CapacitySchedulerPolicy.GUARANTEED_NO_EVICT,
+            CapacitySchedulerPolicy.MAX_UTILIZATION
+        ]
 
         self.space_size = reduce(operator.mul,
                                  [len(v) for v in tunable_options.values()], 1)
@@ -127,14 +127,20 @@ def benchmark_main(model_path: str,
             run_command += " --api executor"
         launch_prefix = f"mpirun -n {tp_size}" if tp_size > 1 else ""
         command = f"{launch_prefix} {run_command}"
-        output = subprocess.run(command,
-                                check=True,
-                                universal_newlines=True,
-                                shell=True,
-                                capture_output=True,
-                                env=os.environ)  # nosec B603
-        print_colored(f'cpp benchmark output: {output.stdout}', "grey")
-        print(f'cpp benchmark error: {output.stderr}', "red")
+        # Stream the output as the benchmark runs, and keep a copy next to the reports
+        with open(f"{report_path_prefix}.cpp.log", "w") as log_file:
+            with subprocess.Popen(command,
+                                  stdout=subprocess.PIPE,
+                                  stderr=subprocess.STDOUT,
+                                  bufsize=1,
+                                  text=True,
+                                  shell=True,
+                                  env=os.environ) as process:  # nosec B603
+                for line in process.stdout:
+                    print_colored(line, "grey")
+                    log_file.write(line)
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, command)
 
     run_hlapi()
     if cpp_executable:
@@ -19,13 +19,16 @@ from utils.llm_data import llm_models_root
 WORLD_SIZE = mpi_world_size()
 
 
-@pytest.fixture(scope="module")
-def llama_7b_path(engine_path: Path) -> Path:
-    path = engine_path / "llama7b"
-
+def build_llama_7b(path: Path,
+                   tp_size: int = 1,
+                   max_beam_width: int = 1) -> Path:
+    ''' Build the llama-7b engine into path unless it is already there.
+    The engines are kept under engine_path, so every test module and later session reuses them. '''
     if not path.exists():
         config = ModelConfig(str(llm_models_root() /
-                                 "llama-models/llama-7b-hf"))
+                                 "llama-models/llama-7b-hf"),
+                             max_beam_width=max_beam_width)
+        config.parallel_config.tp_size = tp_size
         # TODO[chunweiy]: switch to executor backend
         llm = LLM(config, enable_executor=False)
         llm.save(str(path))
@@ -34,33 +37,18 @@ def llama_7b_path(engine_path: Path) -> Path:
 
 
 @pytest.fixture(scope="module")
-def llama_7b_bs2_path(engine_path: Path) -> Path:
-    path = engine_path / "llama7b_bs2"
+def llama_7b_path(engine_path: Path) -> Path:
+    return build_llama_7b(engine_path / "llama7b")
 
-    if not path.exists():
-        config = ModelConfig(str(llm_models_root() /
-                                 "llama-models/llama-7b-hf"),
-                             max_beam_width=2)
-        # TODO[chunweiy]: switch to executor backend
-        llm = LLM(config, enable_executor=False)
-        llm.save(str(path))
 
-    return path
+@pytest.fixture(scope="module")
+def llama_7b_bs2_path(engine_path: Path) -> Path:
+    return build_llama_7b(engine_path / "llama7b_bs2", max_beam_width=2)
 
 
 @pytest.fixture(scope="module")
 def llama_7b_tp2_path(engine_path: Path) -> Path:
-    path = engine_path / "llama7b-tp2"
-
-    if not path.exists():
-        config = ModelConfig(str(llm_models_root() /
-                                 "llama-models/llama-7b-hf"))
-        config.parallel_config.tp_size = 2
-        # TODO[chunweiy]: switch to executor backend
-        llm = LLM(config, enable_executor=False)
-        llm.save(str(path))
-
-    return path
+    return build_llama_7b(engine_path / "llama7b-tp2", tp_size=2)
 
 
 @pytest.mark.parametrize("use_executor_bindings", [False, True])
@@ -128,15 +116,15 @@ def test_sync_generation(use_executor_bindings: bool, llama_7b_path: Path):
 
         # Low-level api with .submit
         # Submit a batch of requests
-        tokenizer = AutoTokenizer.from_pretrained("gpt2")
+        # The tokenizer is loaded once and shared by all the requests
+        hf_tokenizer = AutoTokenizer.from_pretrained(llama_7b_path)
         futures = []
         for _ in range(5):
             futures.append(
                 executor.submit(
-                    GenerationRequest(
-                        prompt,
-                        tokenizer=AutoTokenizer.from_pretrained(llama_7b_path),
-                        sampling_config=sampling_config0)))
+                    GenerationRequest(prompt,
+                                      tokenizer=hf_tokenizer,
+                                      sampling_config=sampling_config0)))
 
         for future in executor.wait_first_completed(futures):
             assert future.done
@@ -150,10 +138,10 @@ def test_sync_generation_tp_all_nodes(llama_7b_tp2_path: Path):
     sampling_config = SamplingConfig(max_new_tokens=4)
 
     # Normal execution, all nodes live
-    executor = GenerationExecutorWorker(llama_7b_tp2_path, llama_7b_tp2_path)
-    result = executor.generate(prompt, sampling_config=sampling_config)
-    assert result.text == "<s> deep learning, neural network,"
-    executor.shutdown()
+    with GenerationExecutorWorker(llama_7b_tp2_path,
+                                  llama_7b_tp2_path) as executor:
+        result = executor.generate(prompt, sampling_config=sampling_config)
+        assert result.text == "<s> deep learning, neural network,"
 
 
 @pytest.mark.parametrize("use_executor_bindings", [False, True])
@@ -186,14 +174,13 @@ def test_sync_generation_tp_inner(use_executor_bindings: bool,
     tp_size = 2
     sampling_config = SamplingConfig(max_new_tokens=4)
 
-    executor = GenerationExecutor.create(
-        llama_7b_tp2_path,
-        llama_7b_tp2_path,
-        model_world_size=tp_size,
-        use_executor_bindings=use_executor_bindings)
-    result = executor.generate(prompt, sampling_config=sampling_config)
-    assert result.text == "<s> deep learning, neural network,"
-    executor.shutdown()
+    with GenerationExecutor.create(
+            llama_7b_tp2_path,
+            llama_7b_tp2_path,
+            model_world_size=tp_size,
+            use_executor_bindings=use_executor_bindings) as executor:
+        result = executor.generate(prompt, sampling_config=sampling_config)
+        assert result.text == "<s> deep learning, neural network,"
 
 
 if __name__ == "__main__":
@@ -6,6 +6,7 @@ import tempfile
 import pytest
 import torch
 from parameterized import parameterized
+from transformers import AutoModelForCausalLM
 
 from tensorrt_llm.hlapi.llm import LLM, KvCacheConfig, ModelConfig
 from tensorrt_llm.hlapi.tokenizer import TransformersTokenizer
@@ -32,23 +33,39 @@ skip_single_gpu = pytest.mark.skipif(
 
 
 @pytest.fixture(scope="module")
-def engine_from_checkpoint() -> tempfile.TemporaryDirectory:
+def llama_tokenizer() -> TransformersTokenizer:
     tokenizer = TransformersTokenizer.from_pretrained(llama_model_path)
     assert tokenizer is not None
+    return tokenizer
+
+
+@pytest.fixture(scope="module")
+def engine_from_checkpoint(
+        llama_tokenizer: TransformersTokenizer) -> tempfile.TemporaryDirectory:
     tp_size = 2
+    # The safetensors are mmap'd and sliced per rank, otherwise load the HF model once and slice both ranks from it
+    have_safetensors = any(
+        f.endswith(".safetensors") for f in os.listdir(llama_model_path))
+    hf_model = None
+    if not have_safetensors:
+        hf_model = AutoModelForCausalLM.from_pretrained(llama_model_path,
+                                                        device_map='auto',
+                                                        torch_dtype='auto')
     with tempfile.TemporaryDirectory() as ckpt_dir:
         for rank in range(tp_size):
             mapping = Mapping(world_size=tp_size, tp_size=tp_size, rank=rank)
             llama = LLaMAForCausalLM.from_hugging_face(llama_model_path,
-                                                       mapping=mapping)
+                                                       mapping=mapping,
+                                                       preloaded_model=hf_model)
             llama.save_checkpoint(ckpt_dir, save_config=(rank == 0))
             del llama
+        del hf_model
 
         config = ModelConfig(ckpt_dir)
         assert config.parallel_config.tp_size == tp_size
         llm = LLM(
             config,
-            tokenizer=tokenizer,
+            tokenizer=llama_tokenizer,
             kv_cache_config=KvCacheConfig(free_gpu_memory_fraction=0.4),
         )
 
@@ -63,10 +80,11 @@ def engine_from_checkpoint() -> tempfile.TemporaryDirectory:
 @pytest.mark.parametrize("enable_executor", [True, False])
 def test_llm_loading_from_ckpt_for_tp2(
         engine_from_checkpoint: tempfile.TemporaryDirectory,
-        enable_executor: bool):
+        llama_tokenizer: TransformersTokenizer, enable_executor: bool):
     config = ModelConfig(engine_from_checkpoint.name)
-    tokenizer = TransformersTokenizer.from_pretrained(llama_model_path)
-    llm = LLM(config, tokenizer=tokenizer, enable_executor=enable_executor)
+    llm = LLM(config,
+              tokenizer=llama_tokenizer,
+              enable_executor=enable_executor)
 
     sampling_config = llm.get_default_sampling_config()
     assert sampling_config is not None
@@ -78,15 +96,15 @@ def test_llm_loading_from_ckpt_for_tp2(
 
 
 @skip_single_gpu
-def test_llm_generate_tp2(engine_from_checkpoint):
+def test_llm_generate_tp2(engine_from_checkpoint,
+                          llama_tokenizer: TransformersTokenizer):
     model_dir = engine_from_checkpoint.name
-    tokenizer = TransformersTokenizer.from_pretrained(llama_model_path)
     config = ModelConfig(model_dir)
     config.parallel_config.tp_size = 2
 
     llm = LLM(
         config,
-        tokenizer=tokenizer,
+        tokenizer=llama_tokenizer,
         kv_cache_config=KvCacheConfig(free_gpu_memory_fraction=0.4),
     )
     for output in llm.generate(prompts):
@@ -97,14 +115,14 @@ def test_llm_generate_tp2(engine_from_checkpoint):
 @pytest.mark.parametrize("use_auto_parallel", [True, False],
                          ids=["enable_auto_parallel", "disable_auto_parallel"])
 def test_llm_generate_async_tp2(
-        use_auto_parallel, engine_from_checkpoint: tempfile.TemporaryDirectory):
+        use_auto_parallel, engine_from_checkpoint: tempfile.TemporaryDirectory,
+        llama_tokenizer: TransformersTokenizer):
     model_dir = engine_from_checkpoint.name if not use_auto_parallel else default_model_name
-    tokenizer = TransformersTokenizer.from_pretrained(llama_model_path)
     _test_llm_generate_async(
         model_dir,
         tp_size=2,
         use_auto_parallel=use_auto_parallel,
-        tokenizer=tokenizer,
+        tokenizer=llama_tokenizer,
     )
 
 
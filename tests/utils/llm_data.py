@@ -1,8 +1,11 @@
+import functools
 import os
 from pathlib import Path
 from typing import Optional
 
 
+# The root is looked up on the (often network) filesystem, resolve it once per process
+@functools.lru_cache(maxsize=None)
 def llm_models_root(check=False) -> Optional[Path]:
     root = Path("/home/scratch.trt_llm_data/llm-models/")
 